@@ -3,6 +3,7 @@
 
 from flask import jsonify, request, abort
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate
 from models import storage
 from models.amenity import Amenity
 
@@ -10,8 +11,7 @@ from models.amenity import Amenity
 @app_views.route('/amenities', methods=['GET'], strict_slashes=False)
 def get_amenities():
     """Retrieves the list of all Amenity objects"""
-    amenities = storage.all(Amenity).values()
-    return jsonify([amenity.to_dict() for amenity in amenities])
+    return paginate(Amenity)
 
 
 @app_views.route(
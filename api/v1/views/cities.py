@@ -3,6 +3,7 @@
 
 from flask import jsonify, request, abort
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate
 from models import storage
 from models.state import State
 from models.city import City
@@ -15,8 +16,7 @@ def get_cities(state_id):
     state = storage.get(State, state_id)
     if not state:
         abort(404)
-    cities = [city.to_dict() for city in state.cities]
-    return jsonify(cities)
+    return paginate(City, state_id=state_id)
 
 
 @app_views.route('/cities/<city_id>', methods=['GET'], strict_slashes=False)
@@ -1,8 +1,8 @@
 #!/usr/bin/python3
 """ Main API module """
-from flask import jsonify
+from flask import abort, jsonify
 from api.v1.views import app_views
-from models import storage
+from models import storage, storage_t
 from models.amenity import Amenity
 from models.city import City
 from models.place import Place
@@ -18,12 +18,23 @@ def get_status():
 
 @app_views.route('/stats', methods=['GET'])
 def get_stats():
+    counts = storage.counts(Amenity, City, Place, Review, State, User)
     stats = {
-        "amenities": storage.count(Amenity),
-        "cities": storage.count(City),
-        "places": storage.count(Place),
-        "reviews": storage.count(Review),
-        "states": storage.count(State),
-        "users": storage.count(User)
+        "amenities": counts["Amenity"],
+        "cities": counts["City"],
+        "places": counts["Place"],
+        "reviews": counts["Review"],
+        "states": counts["State"],
+        "users": counts["User"]
     }
-    return jsonify(stats)
+    response = jsonify(stats)
+    response.headers["Age"] = int(storage.counts_age())
+    return response
+
+
+@app_views.route('/pool', methods=['GET'])
+def get_pool():
+    """Retrieves the DBStorage connection pool counters"""
+    if storage_t != "db":
+        abort(404)
+    return jsonify(storage.pool_stats())
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""pagination of the list endpoints"""
+
+import base64
+import binascii
+from itertools import islice
+import json
+from flask import Response, abort, request, stream_with_context
+from models import storage
+from models.base_model import format_time, parse_time
+
+
+def encode_cursor(cursor):
+    """returns the opaque string for a (created_at, id) cursor"""
+    created_at, id = cursor
+    text = json.dumps([format_time(created_at), id])
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def stream(objs, ndjson=False, chunk=100):
+    """yields the JSON of objs, chunk objects at a time
+
+    The objects form one array, or one object per line with ndjson.
+    """
+    objs = iter(objs)
+    sep, start, end = ("\n", "", "\n") if ndjson else (",", "[", "]\n")
+    first = True
+    while True:
+        batch = [obj.to_dict() for obj in islice(objs, chunk)]
+        if not batch:
+            break
+        if ndjson:
+            text = "\n".join(map(json.dumps, batch))
+        else:
+            text = json.dumps(batch)[1:-1]
+        yield (start if first else sep) + text
+        first = False
+    if first:
+        yield "" if ndjson else "[]\n"
+    else:
+        yield end
+
+
+def decode_cursor(text):
+    """returns the (created_at, id) cursor of an opaque string"""
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(text))
+        if type(id) is str:
+            return parse_time(created_at), id
+    except (binascii.Error, TypeError, ValueError):
+        pass
+    abort(400, description="Invalid cursor")
+
+
+def paginate(cls, **match):
+    """Returns a page of the cls objects matching match
+
+    The page size comes from the limit query parameter, and the page
+    start from cursor; the next page's cursor is sent in X-Next-Cursor.
+    Without limit, every object is returned. The body is streamed, as
+    NDJSON if the client prefers application/x-ndjson.
+    """
+    limit = request.args.get("limit")
+    if limit is not None:
+        if not limit.isdecimal() or int(limit) < 1:
+            abort(400, description="Invalid limit")
+        limit = int(limit)
+    after = request.args.get("cursor")
+    if after is not None:
+        after = decode_cursor(after)
+    objs, cursor = storage.page(cls, limit, after, **match)
+    mimetype = request.accept_mimetypes.best_match(
+        ["application/json", "application/x-ndjson"], "application/json")
+    ndjson = mimetype == "application/x-ndjson"
+    response = Response(stream_with_context(stream(objs, ndjson)),
+                        mimetype=mimetype)
+    if cursor is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(cursor)
+    return response
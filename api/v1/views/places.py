@@ -3,6 +3,7 @@
 
 from flask import jsonify, request, abort
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate
 from models import storage
 from models.city import City
 from models.place import Place
@@ -16,8 +17,7 @@ def get_places(city_id):
     city = storage.get(City, city_id)
     if not city:
         abort(404)
-    places = [place.to_dict() for place in city.places]
-    return jsonify(places)
+    return paginate(Place, city_id=city_id)
 
 
 @app_views.route('/places/<place_id>', methods=['GET'], strict_slashes=False)
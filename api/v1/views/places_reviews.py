@@ -3,6 +3,7 @@
 
 from flask import jsonify, request, abort
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate
 from models import storage
 from models.place import Place
 from models.review import Review
@@ -16,8 +17,7 @@ def get_reviews(place_id):
     place = storage.get(Place, place_id)
     if not place:
         abort(404)
-    reviews = [review.to_dict() for review in place.reviews]
-    return jsonify(reviews)
+    return paginate(Review, place_id=place_id)
 
 
 @app_views.route('/reviews/<review_id>', methods=['GET'], strict_slashes=False)
@@ -3,6 +3,7 @@
 
 from flask import jsonify, request, abort
 from api.v1.views import app_views
+from api.v1.views.pagination import paginate
 from models import storage
 from models.state import State
 
@@ -10,8 +11,7 @@ from models.state import State
 @app_views.route('/states', methods=['GET'], strict_slashes=False)
 def get_states():
     """Retrieves the list of all State objects"""
-    states = storage.all(State).values()
-    return jsonify([state.to_dict() for state in states])
+    return paginate(State)
 
 
 @app_views.route('/states/<state_id>', methods=['GET'], strict_slashes=False)
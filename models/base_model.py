@@ -9,9 +9,47 @@ from os import getenv
 import sqlalchemy
 from sqlalchemy import Column, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
+import sys
 import uuid
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
+# opt-in: file-mode models keep their fields in slots, not in a __dict__
+compact = (models.storage_t != "db" and
+           getenv("HBNB_COMPACT_MODELS") == "1")
+
+
+def format_time(dt):
+    """returns dt formatted with the time format"""
+    if dt.tzinfo is None and dt.year >= 1000:
+        return dt.isoformat(timespec="microseconds")
+    return dt.strftime(time)
+
+
+def parse_time(text):
+    """returns the datetime for text written with the time format"""
+    # fromisoformat is faster but lenient: only trust it with the full
+    # "%Y-%m-%dT%H:%M:%S.%f" shape format_time writes
+    if len(text) != 26 or text[10] != "T" or text[19] != ".":
+        return datetime.strptime(text, time)
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return datetime.strptime(text, time)
+    if dt.tzinfo is not None:
+        return datetime.strptime(text, time)
+    return dt
+
+
+def intern_ids(attrs):
+    """interns the id and foreign key strings of attrs, in place
+
+    Every object referring to the same id then shares one string.
+    """
+    for key, value in attrs.items():
+        if (key == "id" or key[-3:] == "_id") and type(value) is str:
+            attrs[key] = sys.intern(value)
+    return attrs
+
 
 if models.storage_t == "db":
     Base = declarative_base()
@@ -19,34 +57,143 @@ else:
     Base = object
 
 
-class BaseModel:
+class Compact(type):
+    """Metaclass turning the plain class attributes of models into slots
+
+    The class values move to _defaults, where __getattr__ finds them
+    until the slot is set; _members lists every field slot in order.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        """creates the class with a slot for each new field"""
+        defaults = {}
+        members = []
+        for base in reversed(bases):
+            defaults.update(getattr(base, "_defaults", {}))
+            members += [m for m in getattr(base, "_members", ())
+                        if m not in members]
+        known = [m[0] for m in members]
+        names = [n for n in namespace.get("__slots__", ()) if n[0] != "_"]
+        for key, value in list(namespace.items()):
+            if key[0] != "_" and not hasattr(value, "__get__"):
+                defaults[key] = namespace.pop(key)
+                if key not in known:
+                    names.append(key)
+        slots = tuple(namespace.get("__slots__", ()))
+        namespace["__slots__"] = slots + tuple(n for n in names
+                                               if n not in slots)
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._defaults = defaults
+        cls._members = tuple(members) + tuple(
+            (n, getattr(cls, n)) for n in names)
+        return cls
+
+
+class BaseModel(metaclass=Compact if compact else type):
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow)
+    elif compact:
+        # fields in slots; attributes no class declares go to __extra
+        __slots__ = ("__weakref__", "__stamps", "__dirty", "__extra",
+                     "id", "created_at", "updated_at")
+    else:
+        # keeps the formatted timestamps and the dirty flag out of __dict__
+        __slots__ = ("__dict__", "__weakref__", "__stamps", "__dirty")
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
+        if compact:
+            object.__setattr__(self, "_BaseModel__extra", None)
+        if models.storage_t != "db":
+            object.__setattr__(self, "_BaseModel__stamps", None)
+            object.__setattr__(self, "_BaseModel__dirty", True)
         if kwargs:
-            for key, value in kwargs.items():
+            # not in the storage yet: skip the __setattr__ storage hook
+            for key, value in intern_ids(kwargs).items():
                 if key != "__class__":
-                    setattr(self, key, value)
+                    self.__put(key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
+                self.created_at = parse_time(kwargs["created_at"])
             else:
                 self.created_at = datetime.utcnow()
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
+                self.updated_at = parse_time(kwargs["updated_at"])
             else:
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
-                self.id = str(uuid.uuid4())
+                self.id = sys.intern(str(uuid.uuid4()))
         else:
-            self.id = str(uuid.uuid4())
+            self.id = sys.intern(str(uuid.uuid4()))
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute and reports the change to the storage
+
+            The storage hears about the first change after it last wrote
+            the object, and about every foreign key change for its indexes.
+            """
+            if name[-3:] == "_id":
+                old = getattr(self, name, None)
+                if type(value) is str:
+                    value = sys.intern(value)
+                self.__put(name, value)
+            else:
+                old = None
+                self.__put(name, value)
+                # a save clears the flag before serializing: still set, it
+                # has yet to serialize us and will see the new value
+                if self.__dirty:
+                    return
+            object.__setattr__(self, "_BaseModel__dirty", True)
+            models.storage.touch(self, name, old)
+
+        def _clean(self):
+            """marks the object as matching what the storage last wrote"""
+            object.__setattr__(self, "_BaseModel__dirty", False)
+
+    if compact:
+        def __put(self, name, value):
+            """sets name in its slot, or in __extra if it has none"""
+            try:
+                object.__setattr__(self, name, value)
+            except AttributeError:
+                if hasattr(type(self), name):
+                    raise
+                if self.__extra is None:
+                    object.__setattr__(self, "_BaseModel__extra", {})
+                self.__extra[name] = value
+
+        def __getattr__(self, name):
+            """returns the class default, or the extra attribute, for name"""
+            defaults = type(self)._defaults
+            if name in defaults:
+                return defaults[name]
+            if name[:11] != "_BaseModel_" and self.__extra:
+                if name in self.__extra:
+                    return self.__extra[name]
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+
+        @property
+        def __dict__(self):
+            """returns a new dictionary of the attributes set on self"""
+            new_dict = {}
+            for name, member in type(self)._members:
+                try:
+                    new_dict[name] = member.__get__(self)
+                except AttributeError:
+                    pass
+            if self.__extra:
+                new_dict.update(self.__extra)
+            return new_dict
+    else:
+        __put = object.__setattr__
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
@@ -62,14 +209,34 @@ class BaseModel:
         """returns a dictionary containing all keys/values of the instance"""
         new_dict = self.__dict__.copy()
         if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
+            new_dict["created_at"] = self.__stamp(0, new_dict["created_at"])
         if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+            new_dict["updated_at"] = self.__stamp(2, new_dict["updated_at"])
         new_dict["__class__"] = self.__class__.__name__
-        if "_sa_instance_state" in new_dict:
-            del new_dict["_sa_instance_state"]
+        new_dict.pop("_sa_instance_state", None)
         return new_dict
 
+    if models.storage_t != "db":
+        def __stamp(self, i, dt):
+            """returns dt formatted, reusing the string cached at i
+
+            The cache holds [created_at, its string, updated_at, its string]
+            and is checked by identity, so assigning a new datetime to
+            either attribute invalidates its entry.
+            """
+            stamps = self.__stamps
+            if stamps is None:
+                stamps = [None] * 4
+                object.__setattr__(self, "_BaseModel__stamps", stamps)
+            if stamps[i] is not dt:
+                stamps[i + 1] = format_time(dt)
+                stamps[i] = dt
+            return stamps[i + 1]
+    else:
+        def __stamp(self, i, dt):
+            """returns dt formatted"""
+            return format_time(dt)
+
     def delete(self):
         """delete the current instance from the storage"""
         models.storage.delete(self)
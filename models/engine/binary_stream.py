@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Contains helpers to read and write the compact binary storage format
+
+The file starts with the magic bytes b"HBNB" and a version byte, followed
+by blocks of up to block_size records. Each block is a little-endian
+32-bit length and the compact UTF-8 JSON of a list of [key, record]
+pairs, so files stay readable across Python versions. The "id" and
+"__class__" members of a record are left out when they can be rebuilt
+from its "<class name>.<id>" key.
+"""
+
+import json
+import struct
+
+magic = b"HBNB\x02"
+block_size = 1000
+_length = struct.Struct("<I")
+
+
+def iter_items(f):
+    """yields the (key, record) pairs stored in binary file f"""
+    if f.read(len(magic)) != magic:
+        raise ValueError("not a binary storage file")
+    while True:
+        header = f.read(_length.size)
+        if not header:
+            return
+        if len(header) != _length.size:
+            raise ValueError("truncated binary storage file")
+        size, = _length.unpack(header)
+        payload = f.read(size)
+        if len(payload) != size:
+            raise ValueError("truncated binary storage file")
+        block = json.loads(payload.decode("utf-8"))
+        if type(block) is not list or not all(
+                type(item) is list and len(item) == 2 and
+                type(item[0]) is str and type(item[1]) is dict
+                for item in block):
+            raise ValueError("corrupt binary storage file")
+        for key, record in block:
+            name, _, obj_id = key.partition(".")
+            record.setdefault("id", obj_id)
+            record.setdefault("__class__", name)
+            yield key, record
+
+
+def dump_items(items, f):
+    """writes the (key, record) pairs of items to binary file f"""
+    f.write(magic)
+    block = []
+    for key, record in items:
+        name, _, obj_id = key.partition(".")
+        if record.get("id") == obj_id and \
+                record.get("__class__") == name:
+            record = dict(record)
+            del record["id"]
+            del record["__class__"]
+        block.append((key, record))
+        if len(block) == block_size:
+            _dump_block(block, f)
+            block = []
+    if block:
+        _dump_block(block, f)
+
+
+def _dump_block(block, f):
+    """writes one length-prefixed block of records"""
+    payload = json.dumps(block, separators=(",", ":")).encode("utf-8")
+    f.write(_length.pack(len(payload)))
+    f.write(payload)
@@ -7,14 +7,17 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine.pool import InstrumentedPool, instrument
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+import time
+from sqlalchemy import (and_, create_engine, func, literal, or_, select,
+                        union_all)
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -24,6 +27,10 @@ class DBStorage:
     """interaacts with the MySQL database"""
     __engine = None
     __session = None
+    # tuple - (time.monotonic() when counted, counts() of every class)
+    __counted = None
+    # float - seconds the cached counts are served before a recount
+    __counts_ttl = float(getenv('HBNB_STATS_TTL', '5'))
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -32,26 +39,67 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
+        # "always", "idle" (idle longer than HBNB_MYSQL_PING_IDLE) or "never"
+        HBNB_MYSQL_PRE_PING = getenv('HBNB_MYSQL_PRE_PING', 'always')
         self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(
             HBNB_MYSQL_USER,
             HBNB_MYSQL_PWD,
             HBNB_MYSQL_HOST,
             HBNB_MYSQL_DB),
-            pool_pre_ping=True)
+            poolclass=InstrumentedPool,
+            pool_size=int(getenv('HBNB_MYSQL_POOL_SIZE', '5')),
+            max_overflow=int(getenv('HBNB_MYSQL_MAX_OVERFLOW', '10')),
+            pool_recycle=int(getenv('HBNB_MYSQL_POOL_RECYCLE', '-1')),
+            pool_timeout=float(getenv('HBNB_MYSQL_POOL_TIMEOUT', '30')),
+            pool_pre_ping=HBNB_MYSQL_PRE_PING == 'always')
+        instrument(self.__engine, HBNB_MYSQL_PRE_PING,
+                   float(getenv('HBNB_MYSQL_PING_IDLE', '30')))
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    def all(self, cls=None, load=(), order=(), limit=None, **match):
+        """query on the current database session
+
+        load names relationships of cls to fetch with the objects, like
+        ("cities",) or ("cities.places",), one SELECT per level. match
+        (column=value), order (column names, "-name" for descending) and
+        limit become the WHERE, ORDER BY and LIMIT of the query of cls.
+        """
         new_dict = {}
         for clss in classes:
-            if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
-                for obj in objs:
-                    key = obj.__class__.__name__ + '.' + obj.id
-                    new_dict[key] = obj
+            if cls is None:
+                query = self.__session.query(classes[clss])
+            elif cls is classes[clss] or cls == clss:
+                query = self.__query(clss, load, order, limit, match)
+            else:
+                continue
+            for obj in query:
+                key = obj.__class__.__name__ + '.' + obj.id
+                new_dict[key] = obj
         return (new_dict)
 
+    def iterate(self, cls, load=(), order=(), batch=1000, **match):
+        """returns an iterator over the cls objects selected as by all()
+
+        Rows are fetched batch at a time instead of all at once.
+        """
+        name = getattr(cls, "__name__", cls)
+        return self.__query(name, load, order, None, match).yield_per(batch)
+
+    def __query(self, name, load, order, limit, match):
+        """returns the query of class name with the options of all()"""
+        cls = classes[name]
+        query = self.__session.query(cls).options(*self.__loaders(name, load))
+        query = query.filter_by(**match)
+        for column in order:
+            if column[0] == "-":
+                query = query.order_by(getattr(cls, column[1:]).desc())
+            else:
+                query = query.order_by(getattr(cls, column))
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
@@ -59,6 +107,7 @@ class DBStorage:
     def save(self):
         """commit all changes of the current database session"""
         self.__session.commit()
+        DBStorage.__counted = None
 
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
@@ -69,26 +118,103 @@ class DBStorage:
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
-        Session = scoped_session(sess_factory)
-        self.__session = Session()
+        # the registry, not a session: each thread gets its own session
+        self.__session = scoped_session(sess_factory)
 
     def close(self):
-        """call remove() method on the private session attribute"""
+        """call remove() method on the private session attribute
+
+        This closes the session of the calling thread, returning its
+        connection to the pool; the thread's next call opens a new one.
+        """
         self.__session.remove()
 
-    def get(self, cls, id):
-        """Retrieve one object based on class and ID."""
+    def get(self, cls, id, load=()):
+        """Retrieve one object based on class and ID.
+
+        load names relationships to fetch with it, as for all().
+        """
         if cls and id:
-            key = "{}.{}".format(cls.__name__, id)
-            return self.__session.query(cls).filter_by(id=id).first()
+            cls = classes.get(cls, cls)
+            query = self.__session.query(cls)
+            query = query.options(*self.__loaders(cls.__name__, load))
+            return query.filter_by(id=id).first()
         return None
 
+    @staticmethod
+    def __loaders(name, load):
+        """returns the selectin loader options for the paths in load"""
+        loaders = []
+        for path in load:
+            owner = classes[name]
+            loader = None
+            for attr in path.split("."):
+                relation = getattr(owner, attr)
+                if loader is None:
+                    loader = selectinload(relation)
+                else:
+                    loader = loader.selectinload(relation)
+                owner = relation.property.mapper.class_
+            loaders.append(loader)
+        return loaders
+
+    def page(self, cls, limit=None, after=None, **match):
+        """returns up to limit cls objects ordered by (created_at, id)
+
+        after is the (created_at, id) of the last object of the previous
+        page and match holds column values the objects must have.
+        Returns the objects and the cursor of the next page, or None;
+        without limit, the objects come from an iterator over the rows.
+        """
+        cls = classes.get(cls, cls)
+        query = self.__query(cls.__name__, (), ("created_at", "id"), None,
+                             match)
+        if after is not None:
+            created_at, id = after
+            query = query.filter(or_(
+                cls.created_at > created_at,
+                and_(cls.created_at == created_at, cls.id > id)))
+        if limit is None:
+            return query.yield_per(1000), None
+        objs = query.limit(limit + 1).all()
+        if len(objs) <= limit:
+            return objs, None
+        del objs[limit:]
+        return objs, (objs[-1].created_at, objs[-1].id)
+
     def count(self, cls=None):
         """Count the number of objects in storage."""
         if cls:
-            return self.__session.query(cls).count()
-        else:
-            count = 0
-            for cls in self.__models.values():
-                count += self.__session.query(cls).count()
-            return count
+            cls = classes.get(cls, cls)
+            query = select(func.count()).select_from(cls.__table__)
+            return self.__session.execute(query).scalar()
+        return sum(self.counts().values())
+
+    def counts(self, *clss):
+        """returns {class name: count} for clss, or every class
+
+        The counts come back from one UNION ALL query, cached until the
+        next commit or for at most HBNB_STATS_TTL seconds.
+        """
+        counted = self.__counted
+        if (counted is None or
+                time.monotonic() - counted[0] >= self.__counts_ttl):
+            query = union_all(*[
+                select(literal(name).label("name"),
+                       func.count().label("count"))
+                .select_from(cls.__table__) for name, cls in classes.items()])
+            counted = (time.monotonic(),
+                       dict(self.__session.execute(query).all()))
+            DBStorage.__counted = counted
+        names = [getattr(cls, "__name__", cls) for cls in clss]
+        return {name: counted[1][name] for name in names or classes}
+
+    def pool_stats(self):
+        """returns the connection pool counters and occupancy"""
+        return self.__engine.pool.snapshot()
+
+    def counts_age(self):
+        """returns the age in seconds of the counts served by counts()"""
+        if self.__counted is None:
+            return 0.0
+        return time.monotonic() - self.__counted[0]
@@ -3,10 +3,19 @@
 Contains the FileStorage class
 """
 
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import heapq
 import json
+import logging
+import os
+import threading
+import time
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, intern_ids, parse_time
 from models.city import City
+from models.engine import binary_stream, json_stream
+from models.engine.rwlock import RWLock
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -15,72 +24,766 @@ from models.user import User
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# on-disk formats: name -> (module reading and writing it, file mode, path)
+formats = {"binary": (binary_stream, "b", "file.hbnb"),
+           "json": (json_stream, "", "file.json")}
+
+# foreign keys with a reverse index, used by the relationship properties
+relations = {"Amenity": ("place_id",), "City": ("state_id",),
+             "Place": ("city_id",), "Review": ("place_id",)}
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
 
-    # string - path to the JSON file
-    __file_path = "file.json"
+    # string - on-disk format of the snapshot file, a key of formats
+    __format = os.getenv("HBNB_FILE_FORMAT", "json")
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - per-class buckets of __objects: <class name> -> {key: obj}
+    __by_class = {}
+    # dictionary - reverse indexes: (<class name>, fk) -> {value: {key: obj}}
+    __by_parent = {}
+    # bool - append changes to a journal instead of rewriting the JSON file
+    __journal = os.getenv("HBNB_FILE_JOURNAL") == "1"
+    # int - journal records after which the JSON file is compacted
+    __compact_at = int(os.getenv("HBNB_FILE_COMPACT", "1000"))
+    # set - keys created, updated or deleted since the last save
+    __changed = set()
+    # dictionary - to_dict() of the objects unchanged since the last save
+    __records = {}
+    # dictionary - parsed (created_at, id) of the raw dicts paged through
+    __positions = {}
+    # int - records appended to the journal since the last compaction
+    __logged = 0
+    # thread - background compaction in progress, if any
+    __compactor = None
+    # string - when writes are fsynced: "always", "batched" or "never"
+    __fsync = os.getenv("HBNB_FILE_FSYNC", "always")
+    # float - seconds between journal fsyncs under the "batched" policy
+    __fsync_interval = float(os.getenv("HBNB_FILE_FSYNC_INTERVAL", "1"))
+    # float - time of the last journal fsync
+    __synced_at = 0.0
+    # timer - pending fsync of the journal appends left unsynced, if any
+    __sync_timer = None
+    # lock - shared by readers of the store, exclusive for writers
+    __lock = RWLock()
+    # tuple - stat signature of the files as last written or read by us
+    __signature = None
+    # lock - makes taking and publishing a signature one step
+    __signing = threading.Lock()
+    # float - seconds during which save requests are grouped into one write
+    __window = float(os.getenv("HBNB_FILE_COMMIT_WINDOW", "0")) / 1000
+    # condition - guards the group commit counters below
+    __commits = threading.Condition()
+    # int - save requests made, and save requests covered by a finished write
+    __requested = 0
+    __committed = 0
+    # tuple - (last request covered, exception) of the last failed write,
+    # until a later write covers its changes
+    __failed = (0, None)
+    # int - callers blocked in save(wait=True)
+    __waiters = 0
+    # timer - pending group commit, if any
+    __timer = None
+    # bool - keep reloaded records as dicts until an object is asked for
+    __lazy = os.getenv("HBNB_FILE_LAZY") == "1"
+    # bool - keep one snapshot file per class instead of a single file
+    __sharded = os.getenv("HBNB_FILE_SHARDED") == "1"
+
+    def all(self, cls=None, load=(), order=(), limit=None, **match):
+        """returns a copy of __objects, or of the objects of class cls
+
+        load names relationships to preload, as for DBStorage; they are
+        index lookups here, so it is ignored. The objects can be limited
+        to those whose attributes equal match, sorted by the attributes
+        in order ("-name" for descending) and cut to limit.
+        """
+        with self.__lock.read():
+            if cls is not None:
+                objects = dict(self.__by_class.get(self.__class_name(cls), {}))
+            else:
+                objects = dict(self.__objects)
+        if match:
+            objects = {key: obj for key, obj in objects.items()
+                       if all(self.__field(obj, attr) == value
+                              for attr, value in match.items())}
+        if not order and limit is None:
+            return self.__hydrated(objects)
+        items = list(self.__hydrated(objects).items())
+        for attr in reversed(order):
+            items.sort(key=lambda item: getattr(item[1], attr.lstrip("-")),
+                       reverse=attr[0] == "-")
+        return dict(items[:limit])
+
+    def iterate(self, cls, load=(), order=(), batch=1000, **match):
+        """returns an iterator over the cls objects selected as by all()
 
-    def all(self, cls=None):
-        """returns the dictionary __objects"""
-        if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
-        return self.__objects
+        The objects are in memory already, so batch is ignored.
+        """
+        return iter(self.all(cls, load, order, **match).values())
 
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
             key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            with self.__lock.write():
+                self.__add(key, obj)
 
-    def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+    def save(self, wait=False):
+        """serializes __objects to the JSON file (path: __file_path)
 
-    def reload(self):
-        """deserializes the JSON file to __objects"""
+        With a commit window set, the write is left to a background group
+        commit that covers every save requested during the window; pass
+        wait=True to block until the write covering this call is done.
+        """
+        if not self.__window:
+            self.__commit()
+            return
+        with self.__commits:
+            FileStorage.__requested += 1
+            ticket = self.__requested
+            if self.__timer is None:
+                FileStorage.__timer = threading.Timer(self.__window,
+                                                      self.__group_commit)
+                self.__timer.daemon = True
+                self.__timer.start()
+            if not wait:
+                return
+            FileStorage.__waiters += 1
+            try:
+                while self.__committed < ticket:
+                    self.__commits.wait()
+            finally:
+                FileStorage.__waiters -= 1
+            if self.__failed[0] >= ticket:
+                raise self.__failed[1]
+
+    def flush(self):
+        """writes any pending group commit now, raising if the write fails
+
+        Journal appends left unsynced by the "batched" policy are synced.
+        """
+        with self.__commits:
+            if self.__timer is not None:
+                self.__timer.cancel()
+            ticket = self.__requested
+            pending = (self.__committed < ticket or
+                       self.__failed[1] is not None)
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except FileNotFoundError:
-            pass
+            if pending:
+                self.__group_commit()
+                with self.__commits:
+                    if self.__failed[0] >= ticket:
+                        raise self.__failed[1]
+        finally:
+            timer = FileStorage.__sync_timer
+            if timer is not None:
+                timer.cancel()
+                self.__sync_journal()
+
+    def reload(self):
+        """deserializes the JSON file and replays the journal to __objects"""
+        with self.__lock.write():
+            self.__reload()
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
             key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            with self.__lock.write():
+                if key in self.__objects:
+                    self.__remove(key)
+                    self.__changed.add(key)
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+        """reloads the JSON file if it changed since we last wrote or read it
+
+        The files are compared by inode, size and modification time, so the
+        common case of nothing having changed costs a few stat calls, made
+        without locking so request teardowns never stall other readers.
+        Files changed while our own compaction runs are not reloaded.
+        """
+        if self.__signature is not None and (
+                self.__compacting() or self.__signature == self.__stat()):
+            return
+        with self.__lock.write():
+            if self.__signature is None or (
+                    not self.__compacting() and
+                    self.__signature != self.__stat()):
+                self.__reload()
 
-    def get(self, cls, id):
+    def invalidate(self):
+        """forces the next close() to reload, e.g. after an outside write"""
+        FileStorage.__signature = None
+
+    def get(self, cls, id, load=()):
         """Retrieve one object based on class and ID."""
         if cls and id:
-            key = "{}.{}".format(cls.__name__, id)
-            return self.__objects.get(key, None)
+            key = "{}.{}".format(self.__class_name(cls), id)
+            with self.__lock.read():
+                obj = self.__objects.get(key, None)
+            if type(obj) is dict:
+                obj = self.__hydrate([key])[key]
+            return obj
         return None
 
     def count(self, cls=None):
         """Count the number of objects in storage."""
-        if cls:
-            return len(
-                [obj for obj in self.__objects.values()
-                 if isinstance(obj, cls)])
+        with self.__lock.read():
+            if isinstance(cls, str):
+                return len(self.__by_class.get(cls, ()))
+            elif cls:
+                return sum(len(self.__by_class.get(name, ()))
+                           for name, clss in classes.items()
+                           if issubclass(clss, cls))
+            else:
+                return len(self.__objects)
+
+    def counts(self, *clss):
+        """returns {class name: count} for clss, or every class"""
+        names = [self.__class_name(cls) for cls in clss] or list(classes)
+        with self.__lock.read():
+            return {name: len(self.__by_class.get(name, ()))
+                    for name in names}
+
+    def counts_age(self):
+        """returns the age in seconds of the counts served by counts()
+
+        The buckets follow new() and delete(), so counts are never stale.
+        """
+        return 0.0
+
+    def related(self, cls, attr, value):
+        """returns the list of cls objects whose foreign key attr is value"""
+        name = self.__class_name(cls)
+        with self.__lock.read():
+            if attr in relations.get(name, ()):
+                index = self.__by_parent.get((name, attr), {})
+                objects = dict(index.get(value, {}))
+            else:
+                objects = {key: obj for key, obj
+                           in self.__by_class.get(name, {}).items()
+                           if self.__field(obj, attr) == value}
+        return list(self.__hydrated(objects).values())
+
+    def page(self, cls, limit=None, after=None, **match):
+        """returns up to limit cls objects ordered by (created_at, id)
+
+        after is the (created_at, id) of the last object of the previous
+        page and match holds attribute values the objects must have.
+        Returns the objects and the cursor of the next page, or None.
+        """
+        name = self.__class_name(cls)
+        indexed = [attr for attr in match if attr in relations.get(name, ())]
+        with self.__lock.read():
+            if indexed:
+                index = self.__by_parent.get((name, indexed[0]), {})
+                objects = index.get(match[indexed[0]], {})
+            else:
+                objects = self.__by_class.get(name, {})
+            found = [(self.__position(key, obj), key, obj)
+                     for key, obj in objects.items()
+                     if all(self.__field(obj, attr) == value
+                            for attr, value in match.items())]
+        if after is not None:
+            found = [item for item in found if item[0] > after]
+        if limit is None:
+            found.sort()
+            cursor = None
+        else:
+            found = heapq.nsmallest(limit + 1, found)
+            cursor = found[limit - 1][0] if len(found) > limit else None
+            del found[limit:]
+        objects = self.__hydrated({key: obj for _, key, obj in found})
+        return list(objects.values()), cursor
+
+    def changed(self):
+        """returns the objects created or updated since the last save"""
+        with self.__lock.read():
+            return [self.__objects[key] for key in self.__changed
+                    if key in self.__objects]
+
+    def touch(self, obj, attr, old):
+        """records that attr of obj changed from old, moving its indexes"""
+        if getattr(obj, "id", None) is None:
+            return
+        name = obj.__class__.__name__
+        key = name + "." + obj.id
+        if self.__objects.get(key) is not obj:
+            return
+        with self.__lock.write():
+            if self.__objects.get(key) is not obj:
+                return
+            self.__changed.add(key)
+            self.__records.pop(key, None)
+            if attr not in relations.get(name, ()):
+                return
+            index = self.__by_parent.setdefault((name, attr), {})
+            self.__unlink(index, old, key)
+            index.setdefault(getattr(obj, attr, None), {})[key] = obj
+
+    def __commit(self):
+        """writes the changes to the journal or the whole JSON file"""
+        with self.__lock.write():
+            if FileStorage.__journal:
+                self.__append()
+            else:
+                self.__save()
+
+    def __group_commit(self):
+        """writes once for every save requested so far and wakes waiters"""
+        with self.__commits:
+            FileStorage.__timer = None
+            ticket = self.__requested
+            if self.__committed >= ticket and self.__failed[1] is None:
+                return
+        error = None
+        try:
+            self.__commit()
+        except Exception as e:
+            error = e
+            if not self.__waiters:
+                logging.getLogger(__name__).error(
+                    "group commit failed, changes kept for the next save",
+                    exc_info=e)
+        with self.__commits:
+            if error is not None:
+                FileStorage.__failed = (ticket, error)
+            elif self.__failed[0] <= ticket:
+                FileStorage.__failed = (0, None)
+            FileStorage.__committed = max(self.__committed, ticket)
+            self.__commits.notify_all()
+
+    def __save(self):
+        """rewrites the snapshot, or its shards with changes, from __objects"""
+        self.__join_compactor()
+        if self.__sharded:
+            names = {key.partition(".")[0] for key in self.__changed}
+            for name in sorted(names):
+                self.__write(self.__by_class.get(name, {}).items(),
+                             self.__shard_path(name), cache=True)
+        else:
+            self.__write(self.__objects.items(), self.__file_path,
+                         cache=True)
+        FileStorage.__changed = set()
+        for path in self.__journal_paths():
+            if os.path.exists(path):
+                os.remove(path)
+        FileStorage.__logged = 0
+        self.__sign()
+
+    def __reload(self):
+        """loads the JSON file, then replays the journal over __objects"""
+        if self.__window:
+            # write the saves still waiting for a group commit, or the
+            # file would replace the objects they were acknowledged for
+            self.flush()
+        self.__join_compactor()
+        changed = set(self.__changed)
+        if self.__sharded and \
+                not any(map(os.path.exists, self.__snapshot_paths())):
+            # switching to shards: start from the single file and have the
+            # next save split all of it
+            for key, value in self.__read(self.__file_path):
+                self.__add(key, self.__build(value))
+                changed.add(key)
+        elif self.__sharded:
+            paths = self.__snapshot_paths()
+            with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+                for records in pool.map(self.__load, paths):
+                    for key, value in records:
+                        self.__add(key, value)
+        else:
+            for key, value in self.__read(self.__file_path):
+                self.__add(key, self.__build(value))
+        logged = 0
+        for path in self.__journal_paths():
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        self.__replay(line)
+                        logged += 1
+            except FileNotFoundError:
+                pass
+        # the journal left by earlier processes counts towards compaction
+        FileStorage.__logged = logged
+        FileStorage.__changed = changed
+        self.__sign()
+
+    def __add(self, key, obj):
+        """stores obj, or its raw dict, under key in __objects and indexes"""
+        if key in self.__objects:
+            self.__remove(key)
+        name = key.partition(".")[0]
+        self.__objects[key] = obj
+        self.__changed.add(key)
+        self.__records.pop(key, None)
+        self.__by_class.setdefault(name, {})[key] = obj
+        for attr in relations.get(name, ()):
+            index = self.__by_parent.setdefault((name, attr), {})
+            index.setdefault(self.__field(obj, attr), {})[key] = obj
+
+    def __remove(self, key):
+        """drops key from __objects and from its indexes"""
+        obj = self.__objects.pop(key)
+        self.__records.pop(key, None)
+        self.__positions.pop(key, None)
+        name = key.partition(".")[0]
+        del self.__by_class[name][key]
+        for attr in relations.get(name, ()):
+            index = self.__by_parent.get((name, attr), {})
+            self.__unlink(index, self.__field(obj, attr), key)
+
+    def __replace(self, key, raw):
+        """builds the object for the raw dict under key, in place"""
+        obj = classes[raw["__class__"]](**raw)
+        obj._clean()
+        name = key.partition(".")[0]
+        self.__objects[key] = obj
+        self.__positions.pop(key, None)
+        self.__by_class[name][key] = obj
+        for attr in relations.get(name, ()):
+            index = self.__by_parent[(name, attr)]
+            old, value = raw.get(attr), getattr(obj, attr, None)
+            if old != value:
+                self.__unlink(index, old, key)
+            index.setdefault(value, {})[key] = obj
+        return obj
+
+    def __read(self, path):
+        """yields the (key, record) pairs of a snapshot file, if it exists"""
+        stream, mode, _ = formats[self.__format]
+        try:
+            f = open(path, 'r' + mode)
+        except FileNotFoundError:
+            return
+        with f:
+            yield from stream.iter_items(f)
+
+    def __load(self, path):
+        """returns the (key, object) pairs of a shard, run by reload threads"""
+        return [(key, self.__build(value))
+                for key, value in self.__read(path)]
+
+    def __build(self, value):
+        """returns the object for a record, or the record itself if lazy"""
+        if self.__lazy:
+            return intern_ids(value)
+        obj = classes[value["__class__"]](**value)
+        obj._clean()
+        return obj
+
+    def __hydrate(self, keys):
+        """builds the objects still held as raw dicts under keys
+
+        Returns a dictionary of key to object, without the keys deleted
+        in the meantime.
+        """
+        objects = {}
+        with self.__lock.write():
+            for key in keys:
+                obj = self.__objects.get(key)
+                if type(obj) is dict:
+                    obj = self.__replace(key, obj)
+                if obj is not None:
+                    objects[key] = obj
+        return objects
+
+    def __hydrated(self, objects):
+        """replaces the raw dicts among the values of objects by objects"""
+        raw = [key for key, obj in objects.items() if type(obj) is dict]
+        if raw:
+            built = self.__hydrate(raw)
+            for key in raw:
+                if key in built:
+                    objects[key] = built[key]
+                else:
+                    del objects[key]
+        return objects
+
+    def __position(self, key, obj):
+        """returns the (created_at, id) sort key of an object or raw dict
+
+        The key of a raw dict is parsed once and kept until the dict is
+        replaced, so paging a lazy class does not parse it every time.
+        """
+        if type(obj) is not dict:
+            return obj.created_at, obj.id
+        position = self.__positions.get(key)
+        if position is None:
+            position = parse_time(obj["created_at"]), obj["id"]
+            self.__positions[key] = position
+        return position
+
+    @staticmethod
+    def __field(obj, attr):
+        """returns attr of an object or of a raw dict"""
+        if type(obj) is dict:
+            return obj.get(attr)
+        return getattr(obj, attr, None)
+
+    def __serialize(self, key, obj, cache=False):
+        """returns the dictionary to write for an object or a raw dict
+
+        With cache, the object is marked clean and its dictionary is kept
+        until it changes again; the caller must hold the write lock.
+        """
+        if type(obj) is dict:
+            return obj
+        record = self.__records.get(key)
+        if record is not None:
+            return record
+        if not cache:
+            return obj.to_dict()
+        # clean first: a change made meanwhile finds the object clean and
+        # calls touch(), which waits for this write to drop the record
+        obj._clean()
+        record = self.__records[key] = obj.to_dict()
+        return record
+
+    @property
+    def __file_path(self):
+        """path to the snapshot file of the current format"""
+        return formats[self.__format][2]
+
+    def __shard_path(self, name):
+        """path to the snapshot file of class name in sharded mode"""
+        root, ext = os.path.splitext(self.__file_path)
+        return "{}.{}{}".format(root, name, ext)
+
+    def __snapshot_paths(self):
+        """returns the paths of the snapshot files"""
+        if self.__sharded:
+            return [self.__shard_path(name) for name in classes]
+        return [self.__file_path]
+
+    def __stat(self):
+        """returns the stat signature of the snapshot files and journals"""
+        signature = []
+        for path in self.__snapshot_paths() + self.__journal_paths():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        return tuple(signature)
+
+    def __sign(self):
+        """records the signature of the files as we just wrote or read them
+
+        The background compactor signs without the write lock, so the
+        signature is taken under its own lock: the last one published is
+        always the latest.
+        """
+        with self.__signing:
+            FileStorage.__signature = self.__stat()
+
+    def __journal_paths(self):
+        """returns the compacting and the current journal paths, in order"""
+        log = self.__file_path + ".log"
+        return [log + ".1", log]
+
+    def __append(self):
+        """appends one journal record per key changed since the last save"""
+        lines = []
+        for key in self.__changed:
+            obj = self.__objects.get(key)
+            if obj is None:
+                record = {"op": "delete", "key": key}
+            else:
+                record = {"op": "upsert", "key": key,
+                          "value": self.__serialize(key, obj, cache=True)}
+            lines.append(json.dumps(record) + "\n")
+        if not lines:
+            return
+        with open(self.__journal_paths()[1], 'a') as f:
+            f.writelines(lines)
+            self.__sync(f, batched=True)
+        FileStorage.__changed = set()
+        FileStorage.__logged += len(lines)
+        self.__sign()
+        compactor = FileStorage.__compactor
+        if (FileStorage.__logged >= self.__compact_at and
+                (compactor is None or not compactor.is_alive())):
+            self.__join_compactor()
+            self.__start_compactor()
+
+    def __replay(self, line):
+        """applies one journal record to __objects"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # a torn last line from an interrupted append
+            return
+        key = record["key"]
+        if record["op"] == "upsert":
+            value = record["value"]
+            self.__add(key, self.__build(value))
+        elif key in self.__objects:
+            self.__remove(key)
+
+    def __start_compactor(self):
+        """rotates the journal and rewrites the JSON file in a thread"""
+        old_log, log = self.__journal_paths()
+        if os.path.exists(old_log):
+            # left behind by an interrupted compaction: fold it in first
+            with open(log, 'r') as src, open(old_log, 'a') as dst:
+                dst.write(src.read())
+            os.remove(log)
         else:
-            return len(self.__objects)
+            os.replace(log, old_log)
+        FileStorage.__logged = 0
+        objects = list(self.__objects.items())
+        FileStorage.__compactor = threading.Thread(
+            target=self.__compact, args=(objects, old_log), daemon=True)
+        FileStorage.__compactor.start()
+
+    def __compact(self, objects, old_log):
+        """writes objects as the new snapshot and drops the old journal"""
+        if self.__sharded:
+            shards = {name: [] for name in classes}
+            for key, obj in objects:
+                shards.setdefault(key.partition(".")[0], []).append(
+                    (key, obj))
+            for name, shard in shards.items():
+                self.__write(shard, self.__shard_path(name))
+        else:
+            self.__write(objects, self.__file_path)
+        os.remove(old_log)
+        self.__sign()
+
+    def __write(self, objects, path, cache=False):
+        """atomically replaces the file at path with the (key, obj) objects
+
+        The data goes to a temporary file that is fsynced, unless the
+        fsync policy is "never", and then renamed over path, so readers
+        and crashes only ever see the old or the new content.
+        """
+        tmp_path = path + ".tmp"
+        try:
+            stream, mode, _ = formats[self.__format]
+            with open(tmp_path, 'w' + mode) as f:
+                stream.dump_items(((key, self.__serialize(key, obj, cache))
+                                   for key, obj in objects), f)
+                synced = self.__sync(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if synced:
+            self.__sync_dir()
+
+    def __sync(self, f, batched=False):
+        """flushes f to disk if the fsync policy asks for it
+
+        Only journal appends are batched: within an interval they are
+        left to a timer that syncs them when the interval is over.
+        """
+        if FileStorage.__fsync == "never":
+            return False
+        f.flush()
+        if batched and FileStorage.__fsync == "batched":
+            now = time.monotonic()
+            if now - FileStorage.__synced_at < self.__fsync_interval:
+                if FileStorage.__sync_timer is None:
+                    delay = FileStorage.__synced_at + \
+                        self.__fsync_interval - now
+                    FileStorage.__sync_timer = threading.Timer(
+                        delay, self.__sync_journal)
+                    FileStorage.__sync_timer.daemon = True
+                    FileStorage.__sync_timer.start()
+                return False
+            FileStorage.__synced_at = now
+        os.fsync(f.fileno())
+        return True
+
+    def __sync_journal(self):
+        """fsyncs the journal appends left unsynced by the batched policy"""
+        with self.__lock.write():
+            FileStorage.__sync_timer = None
+            FileStorage.__synced_at = time.monotonic()
+            for path in self.__journal_paths():
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                except FileNotFoundError:
+                    continue
+                try:
+                    os.fsync(fd)
+                except OSError as e:
+                    logging.getLogger(__name__).error(
+                        "journal fsync failed", exc_info=e)
+                finally:
+                    os.close(fd)
+
+    def __sync_dir(self):
+        """flushes the directory entry of the JSON file to disk"""
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.__file_path)),
+                         os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def __compacting():
+        """returns whether a background compaction is running"""
+        compactor = FileStorage.__compactor
+        return compactor is not None and compactor.is_alive()
+
+    def __join_compactor(self):
+        """waits for a running compaction to finish"""
+        compactor = FileStorage.__compactor
+        if compactor is not None:
+            compactor.join()
+            FileStorage.__compactor = None
+
+    @staticmethod
+    def __unlink(index, value, key):
+        """removes key from the value entry of a reverse index"""
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del index[value]
+
+    @staticmethod
+    def __class_name(cls):
+        """returns the class name for a class or a class name string"""
+        if isinstance(cls, str):
+            return cls
+        return cls.__name__
+
+
+def convert(src, dst, src_format=None, dst_format=None):
+    """copies the records of storage file src to dst in another format
+
+    Formats default to the one whose file has the same extension as the
+    path. Records are streamed, so no model instance is built.
+    """
+    src_format = src_format or _format_of(src)
+    dst_format = dst_format or _format_of(dst)
+    src_stream, src_mode, _ = formats[src_format]
+    dst_stream, dst_mode, _ = formats[dst_format]
+    with open(src, 'r' + src_mode) as f_src, \
+            open(dst, 'w' + dst_mode) as f_dst:
+        dst_stream.dump_items(src_stream.iter_items(f_src), f_dst)
+
+
+def _format_of(path):
+    """returns the name of the format whose file extension path has"""
+    ext = os.path.splitext(path)[1]
+    for name, (stream, mode, format_path) in formats.items():
+        if os.path.splitext(format_path)[1] == ext:
+            return name
+    raise ValueError("unknown storage file extension: " + path)
+
+
+atexit.register(FileStorage().flush)
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""
+Contains helpers to read and write a JSON object one member at a time
+"""
+
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+class _Reader:
+    """buffered cursor over a text file for raw_decode"""
+
+    def __init__(self, f, size):
+        """Instantiate a reader of f using chunks of size characters"""
+        self.f = f
+        self.size = size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """drops the consumed text and reads the next chunk"""
+        chunk = self.f.read(self.size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """returns the next non-whitespace character, or '' at the end"""
+        while True:
+            while self.pos < len(self.buf) and \
+                    self.buf[self.pos] in _whitespace:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, chars):
+        """consumes the next character, which must be one of chars"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError("Expecting one of " + repr(chars),
+                                       self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        """decodes the next JSON value, reading more text as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self.more():
+                    raise
+                continue
+            if end == len(self.buf) and not self.eof and \
+                    self.buf[end - 1] not in '"}]':
+                # a number or literal may continue in the next chunk
+                self.more()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_items(f, size=1 << 16):
+    """yields the (key, value) members of the JSON object in text file f
+
+    Only one member is decoded at a time, so memory use does not grow
+    with the size of the file.
+    """
+    reader = _Reader(f, size)
+    if not reader.peek():
+        raise json.JSONDecodeError("Expecting value", "", 0)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name",
+                                       reader.buf, reader.pos)
+        reader.expect(":")
+        yield key, reader.value()
+        if reader.expect(",}") == "}":
+            return
+
+
+def dump_items(items, f):
+    """writes the (key, value) pairs of items to f as one JSON object
+
+    The output matches json.dump of the equivalent dictionary.
+    """
+    f.write("{")
+    sep = ""
+    for key, value in items:
+        f.write(sep + json.dumps(key) + ": " + json.dumps(value))
+        sep = ", "
+    f.write("}")
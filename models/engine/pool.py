@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+"""
+Contains the InstrumentedPool class, the connection pool of DBStorage
+"""
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+counters = ("connects", "checkouts", "checkins", "overflows", "waits",
+            "pings", "disconnects")
+
+
+class InstrumentedPool(QueuePool):
+    """QueuePool counting connections, checkouts, overflows and waits"""
+
+    def __init__(self, *args, **kwargs):
+        """Instantiate the pool with zeroed counters"""
+        super().__init__(*args, **kwargs)
+        self.stats = dict.fromkeys(counters, 0)
+        self.stats["wait_seconds"] = 0.0
+        self.stats_lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        """adds amount to the counter name"""
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def recreate(self):
+        """returns the replacement pool, keeping the counters"""
+        pool = super().recreate()
+        pool.stats, pool.stats_lock = self.stats, self.stats_lock
+        return pool
+
+    def _do_get(self):
+        """takes a connection, counting overflow ones and waits for one"""
+        overflow = self.overflow()
+        full = (self.checkedin() == 0 and self._max_overflow > -1 and
+                overflow >= self._max_overflow)
+        tic = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            if full:
+                self.count("waits")
+                self.count("wait_seconds", time.monotonic() - tic)
+            # overflow() counts up from -pool_size as connections open
+            if self.overflow() > max(overflow, 0):
+                self.count("overflows")
+
+    def snapshot(self):
+        """returns the counters and the current occupancy of the pool"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats.update(size=self.size(), checked_in=self.checkedin(),
+                     checked_out=self.checkedout(), overflow=self.overflow())
+        return stats
+
+
+def instrument(engine, ping="always", idle=30.0):
+    """attaches the counting listeners to the pool of engine
+
+    With ping "idle", a connection is pinged on checkout only if it sat
+    in the pool for more than idle seconds; "always" is left to the
+    pool_pre_ping of the engine and "never" does not ping.
+    """
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, record):
+        """counts new DBAPI connections"""
+        engine.pool.count("connects")
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, record):
+        """counts checkins and remembers when the connection went idle"""
+        engine.pool.count("checkins")
+        record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, record, proxy):
+        """counts checkouts and pings connections idle for too long"""
+        engine.pool.count("checkouts")
+        since = record.info.get("idle_since")
+        if ping != "idle" or since is None or time.monotonic() - since < idle:
+            return
+        engine.pool.count("pings")
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            engine.pool.count("disconnects")
+            # the pool replaces the connection and retries the checkout
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
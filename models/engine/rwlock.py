@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Contains the RWLock class
+"""
+
+from contextlib import contextmanager
+import threading
+
+
+class RWLock:
+    """reader-writer lock: many concurrent readers or one exclusive writer
+
+    Waiting writers block new readers so a steady stream of reads cannot
+    starve them. Both sides are re-entrant for the calling thread, and the
+    thread holding the write lock may also take the read lock.
+    """
+
+    def __init__(self):
+        """Instantiate an unlocked RWLock"""
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = None
+        self.__depth = 0
+        self.__waiting = 0
+        self.__local = threading.local()
+
+    def __held(self):
+        """returns the stack of locks held by the calling thread"""
+        try:
+            return self.__local.held
+        except AttributeError:
+            self.__local.held = []
+            return self.__local.held
+
+    def acquire_read(self):
+        """blocks until the calling thread may read"""
+        held = self.__held()
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer == me:
+                self.__depth += 1
+                held.append("w")
+                return
+            if "r" not in held:
+                while self.__writer is not None or self.__waiting:
+                    self.__cond.wait()
+            self.__readers += 1
+            held.append("r")
+
+    def acquire_write(self):
+        """blocks until the calling thread may write"""
+        held = self.__held()
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer == me:
+                self.__depth += 1
+                held.append("w")
+                return
+            if "r" in held:
+                raise RuntimeError("cannot upgrade a read lock to a write")
+            self.__waiting += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__cond.wait()
+            finally:
+                self.__waiting -= 1
+            self.__writer = me
+            self.__depth = 1
+            held.append("w")
+
+    def release(self):
+        """releases the lock most recently acquired by the calling thread"""
+        held = self.__held()
+        with self.__cond:
+            if held.pop() == "w":
+                self.__depth -= 1
+                if self.__depth == 0:
+                    self.__writer = None
+                    self.__cond.notify_all()
+            else:
+                self.__readers -= 1
+                if self.__readers == 0:
+                    self.__cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """context manager holding the read lock"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def write(self):
+        """context manager holding the write lock"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release()
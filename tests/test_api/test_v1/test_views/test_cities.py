@@ -2,6 +2,7 @@
 """test cities"""
 
 import unittest
+import base64
 import json
 from api.v1.app import app
 from models import storage
@@ -27,6 +28,46 @@ class TestCity(unittest.TestCase):
         response = self.client.get(f'/api/v1/states/{self.state.id}/cities')
         self.assertEqual(response.status_code, 200)
 
+    def test_get_cities_pages(self):
+        cities = [City(name=f"Page {i}", state_id=self.state.id) for i in range(2)]
+        for city in cities:
+            storage.new(city)
+        url = f'/api/v1/states/{self.state.id}/cities?limit=2'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.get_json()), 2)
+        cursor = first.headers['X-Next-Cursor']
+        second = self.client.get(f'{url}&cursor={cursor}')
+        self.assertEqual(len(second.get_json()), 1)
+        self.assertNotIn('X-Next-Cursor', second.headers)
+        ids = [city['id'] for city in first.get_json() + second.get_json()]
+        self.assertCountEqual(ids, [self.city.id] + [city.id for city in cities])
+        for city in cities:
+            storage.delete(city)
+
+    def test_get_cities_ndjson(self):
+        response = self.client.get(f'/api/v1/states/{self.state.id}/cities',
+                                   headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.city.id])
+
+    def test_get_cities_empty(self):
+        state = State(name="Empty State")
+        storage.new(state)
+        response = self.client.get(f'/api/v1/states/{state.id}/cities')
+        self.assertEqual(response.get_json(), [])
+        storage.delete(state)
+
+    def test_get_cities_invalid_page(self):
+        url = f'/api/v1/states/{self.state.id}/cities'
+        self.assertEqual(self.client.get(f'{url}?limit=0').status_code, 400)
+        self.assertEqual(self.client.get(f'{url}?cursor=bad').status_code, 400)
+        self.assertEqual(self.client.get(f'{url}?limit=²').status_code, 400)
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(["2017-06-14T22:31:03.285259", 5]).encode()).decode()
+        self.assertEqual(self.client.get(f'{url}?cursor={cursor}').status_code, 400)
+
     def test_get_city(self):
         response = self.client.get(f'/api/v1/cities/{self.city.id}')
         self.assertEqual(response.status_code, 200)
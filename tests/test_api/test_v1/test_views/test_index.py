@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+"""test index"""
+
+import unittest
+from api.v1.app import app
+from models import storage
+from models.state import State
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_status(self):
+        response = self.client.get('/api/v1/status')
+        self.assertEqual(response.get_json(), {"status": "OK"})
+
+    def test_stats(self):
+        before = self.client.get('/api/v1/stats').get_json()['states']
+        state = State(name="Stats State")
+        storage.new(state)
+        storage.save()
+        response = self.client.get('/api/v1/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Age', response.headers)
+        self.assertEqual(response.get_json()['states'], before + 1)
+        storage.delete(state)
+        storage.save()
+
+if __name__ == '__main__':
+    unittest.main()
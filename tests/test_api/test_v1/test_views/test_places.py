@@ -30,7 +30,8 @@ class TestPlace(unittest.TestCase):
 
     def test_get_places(self):
         response = self.client.get(f'/api/v1/cities/{self.city.id}/places')
-        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place['id'] for place in response.get_json()], [self.place.id])
 
     def test_get_place(self):
         response = self.client.get(f'/api/v1/places/{self.place.id}')
@@ -1,9 +1,12 @@
 #!/usr/bin/python3
 """Test BaseModel for expected behavior and documentation"""
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import inspect
 import models
+import os
 import pep8 as pycodestyle
+import subprocess
+import sys
 import time
 import unittest
 from unittest import mock
@@ -158,3 +161,120 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(old_created_at, new_created_at)
         self.assertTrue(mock_storage.new.called)
         self.assertTrue(mock_storage.save.called)
+
+    def test_to_dict_after_update(self):
+        """test that to_dict follows a changed updated_at"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        bm = BaseModel()
+        bm.to_dict()
+        bm.updated_at = bm.updated_at + timedelta(seconds=1)
+        self.assertEqual(bm.to_dict()["updated_at"],
+                         bm.updated_at.strftime(t_format))
+
+    def test_format_time(self):
+        """test that format_time matches the strftime format"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        format_time = models.base_model.format_time
+        for dt in (datetime(2017, 6, 14, 22, 31, 3, 285259),
+                   datetime(2017, 6, 14, 22, 31, 3),
+                   datetime(2017, 6, 14, tzinfo=timezone.utc)):
+            with self.subTest(dt=dt):
+                self.assertEqual(format_time(dt), dt.strftime(t_format))
+
+    def test_parse_time(self):
+        """test that parse_time reads what format_time writes"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        parse_time = models.base_model.parse_time
+        for text in ("2017-06-14T22:31:03.285259",
+                     "2017-06-14T22:31:03.000000",
+                     "2017-06-14T22:31:03.5"):
+            with self.subTest(text=text):
+                self.assertEqual(parse_time(text),
+                                 datetime.strptime(text, t_format))
+        for text in ("2017-06-14T22:31:03+01:00",
+                     "2017-06-14",
+                     "2017-06-14 22:31:03",
+                     "2017-06-14T22:31:03",
+                     "2017-06-14 22:31:03.285259"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_time(text)
+
+    def test_ids_interned(self):
+        """test that equal id strings from kwargs share one object"""
+        parent = BaseModel()
+        children = [BaseModel(parent_id="".join(list(parent.id)))
+                    for _ in range(2)]
+        for child in children:
+            self.assertIs(child.parent_id, parent.id)
+        child = BaseModel(id="".join(list(parent.id)))
+        self.assertIs(child.id, parent.id)
+
+
+@unittest.skipUnless(models.base_model.compact, "HBNB_COMPACT_MODELS only")
+class TestBaseModelCompact(unittest.TestCase):
+    """Test the slots representation of the file-mode models"""
+
+    def test_no_instance_dict(self):
+        """Test that fields are slots and defaults come from the class"""
+        from models.place import Place
+        place = Place(name="Loft")
+        self.assertEqual(Place._defaults["name"], "")
+        self.assertIn("name", Place.__slots__)
+        self.assertEqual(place.name, "Loft")
+        self.assertEqual(place.number_rooms, 0)
+        self.assertEqual(place.amenity_ids, [])
+        self.assertNotIn("number_rooms", place.__dict__)
+
+    def test_extra_attributes(self):
+        """Test that undeclared attributes still round-trip"""
+        inst = BaseModel(color="blue")
+        inst.size = 3
+        self.assertEqual(inst.color, "blue")
+        d = inst.to_dict()
+        self.assertEqual(d["color"], "blue")
+        self.assertEqual(d["size"], 3)
+        self.assertEqual(BaseModel(**d).size, 3)
+        with self.assertRaises(AttributeError):
+            inst.missing
+
+    def test_str(self):
+        """test that the str method lists the set attributes"""
+        inst = BaseModel(name="Holberton")
+        self.assertIn("'name': 'Holberton'", str(inst))
+
+
+@unittest.skipUnless(os.getenv("HBNB_BENCHMARK"), "benchmarks only")
+class TestBaseModelBenchmark(unittest.TestCase):
+    """Benchmarks for the BaseModel hot paths"""
+
+    def test_to_dict_throughput(self):
+        """reports to_dict objects/sec over 100k instances"""
+        insts = [BaseModel(name="bench") for _ in range(100000)]
+        for label in ("first call", "cached"):
+            tic = time.perf_counter()
+            for inst in insts:
+                inst.to_dict()
+            elapsed = time.perf_counter() - tic
+            print("\nto_dict ({}): {:.0f} objects/sec".format(
+                label, len(insts) / elapsed))
+
+    def test_memory_per_object(self):
+        """reports bytes/object for 100k reviews, with and without slots"""
+        script = "\n".join([
+            "import tracemalloc, uuid",
+            "from models.review import Review",
+            "raws = [{'id': str(uuid.uuid4()), 'place_id': 'p',",
+            "         'user_id': 'u', 'text': 'Great stay',",
+            "         'created_at': '2017-06-14T22:31:03.285259',",
+            "         'updated_at': '2017-06-14T22:31:03.285259'}",
+            "        for _ in range(100000)]",
+            "tracemalloc.start()",
+            "objs = [Review(**raw) for raw in raws]",
+            "print(tracemalloc.get_traced_memory()[0] // len(objs))"])
+        for flag in ("0", "1"):
+            env = dict(os.environ, HBNB_COMPACT_MODELS=flag)
+            out = subprocess.run([sys.executable, "-c", script], env=env,
+                                 stdout=subprocess.PIPE, check=True)
+            print("\nHBNB_COMPACT_MODELS={}: {} bytes/object".format(
+                flag, int(out.stdout)))
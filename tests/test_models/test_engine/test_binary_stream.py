@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+""" Testing the binary_stream module. """
+
+import io
+import json
+import unittest
+from models.engine import binary_stream
+
+
+class testBinaryStream(unittest.TestCase):
+    """Testing iter_items and dump_items"""
+
+    data = {"State.1": {"id": "1", "name": "Ohio", "__class__": "State"},
+            "Place.2": {"id": "2", "number_rooms": 3, "latitude": 37.7,
+                        "amenity_ids": [], "description": None,
+                        "__class__": "Place"},
+            "City.3": {"id": "other", "__class__": "State"}}
+
+    def dump(self, items):
+        """returns the bytes dump_items writes for items"""
+        f = io.BytesIO()
+        binary_stream.dump_items(items, f)
+        return f.getvalue()
+
+    def test_round_trip(self):
+        """Tests that records are read back as written, in order"""
+        f = io.BytesIO(self.dump(self.data.items()))
+        items = list(binary_stream.iter_items(f))
+        self.assertEqual([k for k, v in items], list(self.data))
+        self.assertEqual(dict(items), self.data)
+
+    def test_blocks(self):
+        """Tests records spread over several blocks"""
+        data = {"State.{}".format(i): {"id": str(i), "__class__": "State"}
+                for i in range(binary_stream.block_size * 2 + 1)}
+        f = io.BytesIO(self.dump(data.items()))
+        self.assertEqual(dict(binary_stream.iter_items(f)), data)
+
+    def test_dump_does_not_change_records(self):
+        """Tests that the records passed in are left untouched"""
+        record = {"id": "1", "__class__": "State"}
+        self.dump([("State.1", record)])
+        self.assertEqual(record, {"id": "1", "__class__": "State"})
+
+    def test_blocks_are_json(self):
+        """Tests that blocks hold JSON, not a Python specific encoding"""
+        content = self.dump([("State.1", {"id": "1", "name": "Ohio",
+                                          "__class__": "State"})])
+        start = len(binary_stream.magic) + 4
+        self.assertEqual(json.loads(content[start:].decode("utf-8")),
+                         [["State.1", {"name": "Ohio"}]])
+
+    def test_bad_files(self):
+        """Tests that foreign or truncated files raise ValueError"""
+        content = self.dump(self.data.items())
+        for bad in (b"", b"{}", content[:-1], content[:7],
+                    b"HBNB\x01" + content[5:],
+                    content[:5] + b"\x03\x00\x00\x00[1]"):
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    list(binary_stream.iter_items(io.BytesIO(bad)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -116,6 +116,136 @@ class TestFileStorage(unittest.TestCase):
         self.assertEqual(self.storage.count(), initial_count + 1)
         self.assertEqual(self.storage.count(BaseModel), initial_count + 1)
 
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_counts_one_query(self):
+        """test that counts returns every class count in one query"""
+        from sqlalchemy import event
+        statements = []
+        engine = self.storage._DBStorage__engine
+        listener = (lambda *args: statements.append(args[2]))
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            counts = self.storage.counts()
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(set(counts), set(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], self.storage.count(cls))
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_counts_cached_until_commit(self):
+        """test that counts are cached and recounted after a commit"""
+        before = self.storage.counts()["State"]
+        self.assertLess(self.storage.counts_age(), 5)
+        state = State(name="Cached")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertEqual(self.storage.counts()["State"], before + 1)
+        self.storage.delete(state)
+        self.storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_all_load_bounded_selects(self):
+        """test that load fetches the relationships in one more SELECT"""
+        from sqlalchemy import event
+        states = [State(name="Loaded {}".format(i)) for i in range(3)]
+        cities = [City(name=str(i), state_id=state.id)
+                  for state in states for i in range(2)]
+        for obj in states + cities:
+            self.storage.new(obj)
+        self.storage.save()
+        self.storage.reload()
+        statements = []
+        engine = self.storage._DBStorage__engine
+        listener = (lambda *args: statements.append(args[2]))
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            loaded = self.storage.all(State, load=("cities.places",))
+            for state in loaded.values():
+                for city in state.cities:
+                    city.places
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        selects = [s for s in statements if s.lstrip().startswith("SELECT")]
+        self.assertLessEqual(len(selects), 3)
+        for obj in cities + states:
+            self.storage.delete(self.storage.get(type(obj), obj.id))
+            self.storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_session_per_thread(self):
+        """test that threads use their own session, released by close"""
+        import threading
+        registry = self.storage._DBStorage__session
+        sessions = []
+
+        def work():
+            self.storage.count(State)
+            sessions.append(registry())
+            self.storage.close()
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertIsNot(sessions[0], registry())
+        self.storage.close()
+        self.assertEqual(self.storage.pool_stats()["checked_out"], 0)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_all_filters_in_sql(self):
+        """test that all() sends its filter, order and limit to SQL"""
+        from sqlalchemy import event
+        state = State(name="Filtered")
+        cities = [City(name=name, state_id=state.id) for name in "bca"]
+        for obj in [state] + cities:
+            self.storage.new(obj)
+        self.storage.save()
+        statements = []
+        engine = self.storage._DBStorage__engine
+        listener = (lambda *args: statements.append(args[2]))
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            found = self.storage.all(City, order=("-name",), limit=2,
+                                     state_id=state.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        self.assertEqual([c.name for c in found.values()], ["c", "b"])
+        self.assertEqual(len(statements), 1)
+        for clause in ("WHERE", "ORDER BY", "LIMIT"):
+            self.assertIn(clause, statements[0])
+        names = [c.name for c in self.storage.iterate(
+            "City", order=("name",), batch=2, state_id=state.id)]
+        self.assertEqual(names, ["a", "b", "c"])
+        for obj in cities + [state]:
+            self.storage.delete(obj)
+            self.storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_indexes_used(self):
+        """test that the declared indexes exist and serve the lookups"""
+        from models.base_model import Base
+        from sqlalchemy import create_engine, text
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        lookups = {"ix_cities_state_id": "cities WHERE state_id = 'x'",
+                   "ix_cities_name": "cities ORDER BY name",
+                   "ix_places_city_id": "places WHERE city_id = 'x'",
+                   "ix_places_user_id": "places WHERE user_id = 'x'",
+                   "ix_reviews_place_id": "reviews WHERE place_id = 'x'",
+                   "ix_reviews_user_id": "reviews WHERE user_id = 'x'",
+                   "ix_states_name": "states ORDER BY name",
+                   "ix_users_email": "users WHERE email = 'x'"}
+        with engine.connect() as conn:
+            for index, lookup in lookups.items():
+                plan = conn.execute(text(
+                    "EXPLAIN QUERY PLAN SELECT * FROM " + lookup)).all()
+                self.assertIn(index, " ".join(row[-1] for row in plan))
+        self.assertTrue(User.__table__.c.email.unique)
+        engine.dispose()
+
 
 if __name__ == "__main__":
     unittest.main()
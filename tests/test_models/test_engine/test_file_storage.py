@@ -2,18 +2,55 @@
 """ Testing the file_storage module. """
 
 import os
+import threading
 import time
+import tracemalloc
 import json
+from datetime import datetime
 import unittest
+import unittest.mock
 import models
 from models import storage
 from models.base_model import BaseModel
+from models.city import City
 from models.state import State
-from models.engine.file_storage import FileStorage
+from models.engine import binary_stream, json_stream
+from models.engine.file_storage import FileStorage, convert
 
 db = os.getenv("HBNB_TYPE_STORAGE")
 
 
+def set_flags(test, **flags):
+    """sets FileStorage class attributes, named without their prefix,
+    until the end of test"""
+    for name, value in flags.items():
+        patcher = unittest.mock.patch.object(
+            FileStorage, "_FileStorage__" + name, value)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+def snapshot(storage):
+    """returns the records of the snapshot files of storage by key"""
+    records = {}
+    for path in storage._FileStorage__snapshot_paths():
+        records.update(storage._FileStorage__read(path))
+    return records
+
+
+def remove_files(storage):
+    """removes the snapshot, journal and temporary files of storage"""
+    paths = [storage._FileStorage__file_path]
+    paths += storage._FileStorage__snapshot_paths()
+    paths += storage._FileStorage__journal_paths()
+    for path in paths:
+        for name in (path, path + ".tmp"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+
 @unittest.skipIf(db == "db", "Testing DBstorage only")
 class testFileStorage(unittest.TestCase):
     """Testing the FileStorage class"""
@@ -21,6 +58,8 @@ class testFileStorage(unittest.TestCase):
     def setUp(self):
         """Initializing classes"""
         self.storage = FileStorage()
+        set_flags(self, journal=False, window=0, format="json",
+                  sharded=False)
         self.my_model = BaseModel()
 
     def tearDown(self):
@@ -124,3 +163,886 @@ class testFileStorage(unittest.TestCase):
         new_state3 = State(name="California")
         storage.new(new_state3)
         self.assertEqual(old_count + 3, storage.count("State"))
+
+    def test_all_class_bucket(self):
+        """Test that all(cls) only returns objects of that class"""
+        new_state = State(name="Oregon")
+        self.storage.new(new_state)
+        key = "State.{}".format(new_state.id)
+        by_class = self.storage.all(State)
+        by_name = self.storage.all("State")
+        self.assertIn(key, by_class)
+        self.assertEqual(by_class, by_name)
+        for obj in by_class.values():
+            self.assertIs(type(obj), State)
+        self.storage.delete(new_state)
+        self.assertNotIn(key, self.storage.all(State))
+
+    def test_count_follows_new_and_delete(self):
+        """Test that count(cls) tracks new() and delete()"""
+        old_count = self.storage.count(State)
+        new_state = State(name="Texas")
+        self.storage.new(new_state)
+        self.storage.new(new_state)
+        self.assertEqual(self.storage.count(State), old_count + 1)
+        self.storage.delete(new_state)
+        self.assertEqual(self.storage.count(State), old_count)
+        self.assertEqual(self.storage.count(BaseModel), self.storage.count())
+
+    def test_all_filter_order_limit(self):
+        """Test that all() filters, sorts and limits the objects"""
+        state = State(name="Filtered")
+        cities = [City(name=name, state_id=state.id) for name in "bca"]
+        for city in cities:
+            self.storage.new(city)
+        found = self.storage.all(City, state_id=state.id)
+        self.assertCountEqual(found.values(), cities)
+        found = self.storage.all(City, order=("-name",), state_id=state.id)
+        self.assertEqual([c.name for c in found.values()], ["c", "b", "a"])
+        found = self.storage.all(City, order=("name",), limit=2,
+                                 state_id=state.id)
+        self.assertEqual([c.name for c in found.values()], ["a", "b"])
+        self.assertEqual(
+            list(self.storage.iterate(City, order=("name",),
+                                      state_id=state.id)),
+            [cities[2], cities[0], cities[1]])
+        for city in cities:
+            self.storage.delete(city)
+
+    def test_counts(self):
+        """Test that counts matches count for each class"""
+        counts = self.storage.counts(State, "City")
+        self.assertEqual(counts, {"State": self.storage.count(State),
+                                  "City": self.storage.count(City)})
+        self.assertEqual(sum(self.storage.counts().values()),
+                         self.storage.count())
+
+    def test_related_follows_foreign_keys(self):
+        """Test that the reverse index follows new, setattr and delete"""
+        ca = State(name="California")
+        nv = State(name="Nevada")
+        city = City(name="Reno", state_id=ca.id)
+        for obj in (ca, nv, city):
+            self.storage.new(obj)
+        self.assertEqual(ca.cities, [city])
+        self.assertEqual(nv.cities, [])
+        city.state_id = nv.id
+        self.assertEqual(ca.cities, [])
+        self.assertEqual(nv.cities, [city])
+        self.storage.delete(city)
+        self.assertEqual(nv.cities, [])
+        for obj in (ca, nv):
+            self.storage.delete(obj)
+
+    def test_related_after_reload(self):
+        """Test that the reverse index is rebuilt by reload"""
+        state = State(name="Utah")
+        city = City(name="Provo", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        self.storage.reload()
+        cities = state.cities
+        self.assertEqual([c.id for c in cities], [city.id])
+        self.assertIsNot(cities[0], city)
+        self.storage.delete(cities[0])
+        self.storage.delete(state)
+
+    def test_concurrent_access(self):
+        """Tests that readers can iterate while other threads write"""
+        errors = []
+        stop = threading.Event()
+
+        def writer():
+            try:
+                while not stop.is_set():
+                    state = State(name="Busy")
+                    self.storage.new(state)
+                    state.name = "Busier"
+                    self.storage.delete(state)
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(50):
+                    for obj in self.storage.all().values():
+                        obj.id
+                    self.storage.count(State)
+                    self.storage.save()
+            except Exception as e:
+                errors.append(e)
+
+        writers = [threading.Thread(target=writer) for _ in range(2)]
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        for t in writers + readers:
+            t.start()
+        for t in readers:
+            t.join()
+        stop.set()
+        for t in writers:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_page(self):
+        """Tests keyset pages ordered by (created_at, id)"""
+        state = State(name="Paged")
+        stamp = datetime(2017, 6, 14)
+        cities = [City(name=str(i), state_id=state.id) for i in range(4)]
+        for city in cities[:3]:
+            city.created_at = stamp
+        for city in cities:
+            storage.new(city)
+        expected = sorted(cities[:3], key=lambda city: city.id) + cities[3:]
+        objs, cursor = storage.page(City, 2, state_id=state.id)
+        self.assertEqual(objs, expected[:2])
+        self.assertEqual(cursor, (stamp, expected[1].id))
+        objs, cursor = storage.page(City, 2, cursor, state_id=state.id)
+        self.assertEqual(objs, expected[2:])
+        self.assertIsNone(cursor)
+        objs, cursor = storage.page("City", None, state_id=state.id)
+        self.assertEqual(objs, expected)
+        for city in cities:
+            storage.delete(city)
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageJournal(unittest.TestCase):
+    """Testing the journaled mode of the FileStorage class"""
+
+    def setUp(self):
+        """Switches the storage to journaled mode"""
+        self.storage = FileStorage()
+        set_flags(self, journal=False, window=0, fsync="always",
+                  compact_at=1000)
+        self.storage.save()
+        set_flags(self, journal=True)
+
+    def tearDown(self):
+        """Cleans up"""
+        self.storage._FileStorage__join_compactor()
+        remove_files(self.storage)
+
+    def read_log(self):
+        """returns the journal records"""
+        with open(self.storage._FileStorage__journal_paths()[1],
+                  encoding="UTF8") as fd:
+            return [json.loads(line) for line in fd]
+
+    def test_save_appends_changes(self):
+        """Tests that save appends only the changed objects"""
+        before = snapshot(self.storage)
+        state = State(name="Ohio")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Iowa"
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.save()
+        records = self.read_log()
+        self.assertEqual([r["op"] for r in records],
+                         ["upsert", "upsert", "delete"])
+        self.assertEqual(records[1]["value"]["name"], "Iowa")
+        self.assertEqual(snapshot(self.storage), before)
+
+    def test_reload_replays_journal(self):
+        """Tests that reload applies the journal over the JSON file"""
+        kept = State(name="Maine")
+        dropped = State(name="Idaho")
+        self.storage.new(kept)
+        self.storage.new(dropped)
+        self.storage.save()
+        self.storage.delete(dropped)
+        kept.name = "Vermont"
+        self.storage.save()
+        self.storage.new(dropped)
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, kept.id).name, "Vermont")
+        self.assertIsNone(self.storage.get(State, dropped.id))
+        self.storage.delete(self.storage.get(State, kept.id))
+        self.storage.save()
+
+    def test_compaction(self):
+        """Tests that a long journal is compacted into the JSON file"""
+        set_flags(self, compact_at=3)
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            self.storage.new(state)
+            self.storage.save()
+        self.storage._FileStorage__join_compactor()
+        self.assertFalse(os.path.exists(
+            self.storage._FileStorage__journal_paths()[0]))
+        content = snapshot(self.storage)
+        for state in states:
+            self.assertIn("State." + state.id, content)
+            self.storage.delete(state)
+        self.storage.save()
+
+    def test_close_during_compaction(self):
+        """Tests that close does not reload files our compaction rewrites"""
+        set_flags(self, compact_at=1)
+        written, done = threading.Event(), threading.Event()
+        write = FileStorage._FileStorage__write
+
+        def slow_write(storage, objects, path, cache=False):
+            """writes the snapshot, then holds the compaction"""
+            write(storage, objects, path, cache)
+            written.set()
+            done.wait(5)
+
+        state = State(name="Idaho")
+        self.storage.new(state)
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__write", slow_write), \
+                unittest.mock.patch.object(
+                    FileStorage, "_FileStorage__reload") as reload:
+            self.storage.save()
+            written.wait(5)
+            self.storage.close()
+            done.set()
+            self.storage._FileStorage__join_compactor()
+            self.storage.close()
+        reload.assert_not_called()
+        self.storage.delete(state)
+        self.storage.save()
+
+    def test_compaction_across_reloads(self):
+        """Tests that a reload counts the replayed journal for compaction"""
+        set_flags(self, compact_at=5)
+        states = [State(name=str(i)) for i in range(6)]
+        for state in states:
+            # as in a new process
+            FileStorage._FileStorage__logged = 0
+            self.storage.reload()
+            self.storage.new(state)
+            self.storage.save()
+        self.storage._FileStorage__join_compactor()
+        self.assertIn("State." + states[4].id, snapshot(self.storage))
+        for state in states:
+            self.storage.delete(state)
+        self.storage.save()
+
+    def test_batched_appends_are_synced(self):
+        """Tests that the last appends of a batch are synced by a timer"""
+        set_flags(self, fsync="batched", fsync_interval=0.05, synced_at=0.0)
+        state = State(name="Texas")
+        with unittest.mock.patch("os.fsync") as fsync:
+            self.storage.new(state)
+            self.storage.save()
+            self.assertEqual(fsync.call_count, 1)
+            state.name = "Utah"
+            self.storage.save()
+            self.assertEqual(fsync.call_count, 1)
+            FileStorage._FileStorage__sync_timer.join()
+            self.assertEqual(fsync.call_count, 2)
+        self.storage.delete(state)
+        self.storage.save()
+
+    def test_failed_append_keeps_changes(self):
+        """Tests that changes stay pending when the journal write fails"""
+        state = State(name="Nevada")
+        self.storage.new(state)
+        with unittest.mock.patch.object(os, "fsync", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertIn(state, self.storage.changed())
+        self.storage.save()
+        self.assertEqual(self.read_log()[-1]["key"], "State." + state.id)
+        self.storage.delete(state)
+        self.storage.save()
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageAtomicSave(unittest.TestCase):
+    """Testing the crash-safe writes of the FileStorage class"""
+
+    def setUp(self):
+        """Initializing the storage"""
+        self.storage = FileStorage()
+        set_flags(self, journal=False, window=0, sharded=False,
+                  fsync="always", synced_at=0.0)
+        self.path = self.storage._FileStorage__file_path
+
+    def tearDown(self):
+        """Cleaning up."""
+        remove_files(self.storage)
+
+    def test_save_leaves_no_temp_file(self):
+        """Tests that save renames its temporary file over file.json"""
+        self.storage.save()
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_failed_save_keeps_old_file(self):
+        """Tests that an interrupted save does not truncate file.json"""
+        self.storage.save()
+        with open(self.path, "rb") as fd:
+            before = fd.read()
+        state = State(name="Kansas")
+        self.storage.new(state)
+        with unittest.mock.patch("json.dumps", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+        with open(self.path, "rb") as fd:
+            self.assertEqual(fd.read(), before)
+        self.storage.delete(state)
+
+    def test_fsync_policies(self):
+        """Tests that the fsync policy decides when os.fsync runs"""
+        for policy, calls in (("always", 2), ("never", 0)):
+            FileStorage._FileStorage__fsync = policy
+            with unittest.mock.patch("os.fsync") as fsync:
+                self.storage.save()
+                self.assertEqual(fsync.call_count, calls)
+        FileStorage._FileStorage__fsync = "batched"
+        with unittest.mock.patch("os.fsync") as fsync:
+            self.storage.save()
+            self.storage.save()
+            # snapshots are synced before every rename
+            self.assertEqual(fsync.call_count, 4)
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageClose(unittest.TestCase):
+    """Testing that close only reloads a changed file"""
+
+    def setUp(self):
+        """Initializing the storage"""
+        self.storage = FileStorage()
+        set_flags(self, journal=False, window=0, format="json",
+                  sharded=False)
+        self.path = self.storage._FileStorage__file_path
+        self.storage.save()
+
+    def tearDown(self):
+        """Cleaning up."""
+        remove_files(self.storage)
+
+    def test_close_skips_unchanged_file(self):
+        """Tests that close does not reload a file we just wrote"""
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__reload") as reload:
+            self.storage.close()
+            reload.assert_not_called()
+
+    def test_close_does_not_block_readers(self):
+        """Tests that close of an unchanged file takes no exclusive lock"""
+        closer = threading.Thread(target=self.storage.close)
+        with self.storage._FileStorage__lock.read():
+            closer.start()
+            closer.join(1)
+            self.assertFalse(closer.is_alive())
+
+    def test_close_reloads_changed_file(self):
+        """Tests that close reloads a file written by someone else"""
+        state = State(name="Alaska")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.path, encoding="UTF8") as fd:
+            content = json.load(fd)
+        content["State." + state.id]["name"] = "Hawaii"
+        with open(self.path, "w", encoding="UTF8") as fd:
+            json.dump(content, fd)
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, state.id).name, "Hawaii")
+        self.storage.delete(self.storage.get(State, state.id))
+
+    def test_invalidate(self):
+        """Tests that invalidate forces the next close to reload"""
+        self.storage.invalidate()
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__reload") as reload:
+            self.storage.close()
+            reload.assert_called_once()
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageGroupCommit(unittest.TestCase):
+    """Testing the grouped writes of the FileStorage class"""
+
+    def setUp(self):
+        """Opens a commit window"""
+        self.storage = FileStorage()
+        set_flags(self, window=0.05, journal=False, sharded=False)
+        self.path = self.storage._FileStorage__file_path
+
+    def tearDown(self):
+        """Writes what is left and cleans up"""
+        self.storage.flush()
+        remove_files(self.storage)
+
+    def test_saves_are_grouped(self):
+        """Tests that a burst of saves results in a single write"""
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__save") as write:
+            for _ in range(20):
+                self.storage.save()
+            self.assertEqual(write.call_count, 0)
+            self.storage.save(wait=True)
+            self.assertEqual(write.call_count, 1)
+
+    def test_wait_for_durability(self):
+        """Tests that save(wait=True) returns once the file is written"""
+        state = State(name="Georgia")
+        self.storage.new(state)
+        self.storage.save(wait=True)
+        self.assertIn("State." + state.id, snapshot(self.storage))
+        self.storage.delete(state)
+
+    def test_flush(self):
+        """Tests that flush writes a pending group commit right away"""
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.storage.flush()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_reload_keeps_pending_saves(self):
+        """Tests that a reload does not undo a save not yet written"""
+        state = State(name="Alabama")
+        self.storage.new(state)
+        self.storage.save(wait=True)
+        state.name = "Alaska"
+        self.storage.save()
+        # another process rewrites the file meanwhile
+        with open(self.path, "rb") as fd:
+            content = fd.read()
+        with open(self.path + ".tmp", "wb") as fd:
+            fd.write(content)
+        os.replace(self.path + ".tmp", self.path)
+        self.storage.close()
+        self.storage.flush()
+        key = "State." + state.id
+        self.assertEqual(self.storage.all(State)[key].name, "Alaska")
+        self.assertEqual(snapshot(self.storage)[key]["name"], "Alaska")
+        self.storage.delete(self.storage.all(State)[key])
+
+    def test_failed_write_is_raised_to_waiters(self):
+        """Tests that a waiting caller sees the write error"""
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__save", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.save(wait=True)
+
+    def test_failed_flush_raises(self):
+        """Tests that flush raises the error of the write it forced"""
+        self.storage.save()
+        with unittest.mock.patch.object(os, "replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failed_write_without_waiter_is_logged(self):
+        """Tests that a background write error nobody waits for is logged"""
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__save", side_effect=OSError):
+            with self.assertLogs("models.engine.file_storage", "ERROR"):
+                self.storage.save()
+                FileStorage._FileStorage__timer.join()
+
+    def test_flush_retries_failed_write(self):
+        """Tests that flush writes the changes of a failed group commit"""
+        state = State(name="Oregon")
+        self.storage.new(state)
+        with unittest.mock.patch.object(
+                FileStorage, "_FileStorage__save", side_effect=OSError):
+            with self.assertLogs("models.engine.file_storage", "ERROR"):
+                self.storage.save()
+                FileStorage._FileStorage__timer.join()
+        self.storage.flush()
+        self.assertIn("State." + state.id, snapshot(self.storage))
+        self.storage.delete(state)
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageLazy(unittest.TestCase):
+    """Testing the lazy reload of the FileStorage class"""
+
+    def setUp(self):
+        """Saves a state and a city, then reloads them lazily"""
+        self.storage = FileStorage()
+        self.state = State(name="Arizona")
+        self.city = City(name="Tucson", state_id=self.state.id)
+        set_flags(self, journal=False, window=0)
+        self.storage.new(self.state)
+        self.storage.new(self.city)
+        self.storage.save()
+        set_flags(self, lazy=True)
+        self.storage.reload()
+        self.objects = self.storage._FileStorage__objects
+
+    def tearDown(self):
+        """Cleans up"""
+        for obj in self.storage.all().values():
+            if obj.id in (self.state.id, self.city.id):
+                self.storage.delete(obj)
+        remove_files(self.storage)
+
+    def test_reload_keeps_dicts(self):
+        """Tests that reload stores raw records and count sees them"""
+        self.assertIs(type(self.objects["State." + self.state.id]), dict)
+        self.assertIn("State." + self.state.id, self.storage.all("State"))
+        self.assertGreaterEqual(self.storage.count(State), 1)
+
+    def test_get_hydrates(self):
+        """Tests that get builds the object once, on first access"""
+        state = self.storage.get(State, self.state.id)
+        self.assertIsInstance(state, State)
+        self.assertEqual(state.name, "Arizona")
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        self.assertIs(self.objects["State." + self.state.id], state)
+        self.assertIs(type(self.objects["City." + self.city.id]), dict)
+
+    def test_related_hydrates(self):
+        """Tests that relationship getters build the related objects"""
+        state = self.storage.get(State, self.state.id)
+        cities = state.cities
+        self.assertEqual([c.id for c in cities], [self.city.id])
+        self.assertIsInstance(cities[0], City)
+
+    def test_page_parses_raw_records_once(self):
+        """Tests that paging does not parse raw timestamps every time"""
+        city = City(name="Phoenix", state_id=self.state.id)
+        self.storage.new(city)
+        self.storage.save()
+        self.storage.reload()
+        parse_time = models.engine.file_storage.parse_time
+        with unittest.mock.patch("models.engine.file_storage.parse_time",
+                                 side_effect=parse_time) as parse:
+            first, cursor = self.storage.page(City, 1,
+                                              state_id=self.state.id)
+            parse.reset_mock()
+            self.storage.page(City, 1, state_id=self.state.id)
+            self.storage.page(City, 1, after=cursor, state_id=self.state.id)
+        parse.assert_not_called()
+        self.assertEqual([c.id for c in first], [self.city.id])
+        self.storage.delete(self.storage.get(City, city.id))
+
+    def test_save_raw_records(self):
+        """Tests that save writes raw records without building them"""
+        self.storage.save()
+        self.assertIs(type(self.objects["City." + self.city.id]), dict)
+        content = snapshot(self.storage)
+        self.assertEqual(content["City." + self.city.id]["name"], "Tucson")
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageBinary(unittest.TestCase):
+    """Testing the binary format of the FileStorage class"""
+
+    def setUp(self):
+        """Switches the storage to the binary format"""
+        self.storage = FileStorage()
+        set_flags(self, format="binary", journal=False, window=0,
+                  sharded=False)
+        self.path = self.storage._FileStorage__file_path
+
+    def tearDown(self):
+        """Cleans up"""
+        remove_files(self.storage)
+        try:
+            os.remove("copy.json")
+        except FileNotFoundError:
+            pass
+
+    def test_save_and_reload(self):
+        """Tests that objects survive a binary save and reload"""
+        state = State(name="Montana")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertFalse(os.path.exists("file.json"))
+        self.storage.delete(state)
+        self.storage.reload()
+        loaded = self.storage.get(State, state.id)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+        self.storage.delete(loaded)
+
+    def test_convert(self):
+        """Tests converting binary to JSON and back"""
+        state = State(name="Wyoming")
+        self.storage.new(state)
+        self.storage.save()
+        os.rename(self.path, "copy.hbnb")
+        convert("copy.hbnb", "copy.json")
+        convert("copy.json", self.path)
+        os.remove("copy.hbnb")
+        with open("copy.json", encoding="UTF8") as fd:
+            content = json.load(fd)
+        self.assertEqual(content["State." + state.id]["name"], "Wyoming")
+        self.storage.delete(state)
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "Wyoming")
+        self.storage.delete(self.storage.get(State, state.id))
+
+    def test_convert_unknown_extension(self):
+        """Tests that convert needs a known extension or format"""
+        with self.assertRaises(ValueError):
+            convert("file.txt", "file.json")
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageDirty(unittest.TestCase):
+    """Testing that save only reserializes changed objects"""
+
+    def setUp(self):
+        """Saves a state so it starts clean"""
+        self.storage = FileStorage()
+        set_flags(self, journal=False, window=0)
+        self.state = State(name="Arizona")
+        self.storage.new(self.state)
+        self.storage.save()
+
+    def tearDown(self):
+        """Cleans up the state and the files"""
+        self.storage.delete(self.state)
+        remove_files(self.storage)
+
+    def test_clean_after_save(self):
+        """Tests that a saved object is not reserialized on the next save"""
+        self.assertNotIn(self.state, self.storage.changed())
+        with unittest.mock.patch.object(State, "to_dict") as to_dict:
+            self.storage.save()
+        to_dict.assert_not_called()
+
+    def test_setattr_marks_dirty(self):
+        """Tests that a change is reserialized and written by save"""
+        self.state.name = "Nevada"
+        self.assertIn(self.state, self.storage.changed())
+        self.storage.save()
+        self.assertNotIn(self.state, self.storage.changed())
+        content = snapshot(self.storage)
+        self.assertEqual(content["State." + self.state.id]["name"], "Nevada")
+
+    def test_change_after_save(self):
+        """Tests that an object changed again after a save is dirty again"""
+        self.state.name = "Nevada"
+        self.storage.save()
+        self.state.name = "Utah"
+        self.storage.save()
+        content = snapshot(self.storage)
+        self.assertEqual(content["State." + self.state.id]["name"], "Utah")
+
+    def test_change_during_save(self):
+        """Tests that a change racing with a save is not lost"""
+        self.state.name = "Nevada"
+        entered, done = threading.Event(), threading.Event()
+
+        def put(obj, name, value):
+            """sets the attribute once the save is over"""
+            entered.set()
+            done.wait(5)
+            object.__setattr__(obj, name, value)
+
+        with unittest.mock.patch.object(State, "_BaseModel__put", put):
+            thread = threading.Thread(target=setattr,
+                                      args=(self.state, "name", "Utah"))
+            thread.start()
+            entered.wait(5)
+            self.storage.save()
+            done.set()
+            thread.join()
+        self.storage.save()
+        content = snapshot(self.storage)
+        self.assertEqual(content["State." + self.state.id]["name"], "Utah")
+
+    def test_reload_is_clean(self):
+        """Tests that reloaded objects start clean"""
+        self.storage.reload()
+        self.assertEqual(self.storage.changed(), [])
+
+
+@unittest.skipIf(db == "db", "Testing DBstorage only")
+class testFileStorageSharded(unittest.TestCase):
+    """Testing the sharded mode of the FileStorage class"""
+
+    def setUp(self):
+        """Switches the storage to one file per class"""
+        self.storage = FileStorage()
+        set_flags(self, sharded=True, journal=False, window=0)
+        self.storage.save()
+
+    def tearDown(self):
+        """Cleans up"""
+        remove_files(self.storage)
+
+    def shard(self, name):
+        """returns the path of the shard of class name"""
+        return self.storage._FileStorage__shard_path(name)
+
+    def read_shard(self, name):
+        """returns the records of the shard of class name by key"""
+        return dict(self.storage._FileStorage__read(self.shard(name)))
+
+    def test_save_writes_dirty_shards(self):
+        """Tests that save only rewrites the shards of changed classes"""
+        state = State(name="Indiana")
+        city = City(name="Gary", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        self.assertIn("State." + state.id, self.read_shard("State"))
+        self.assertIn("City." + city.id, self.read_shard("City"))
+        city.name = "Indianapolis"
+        with unittest.mock.patch("os.replace") as replace:
+            self.storage.save()
+        self.assertEqual([c[0][1] for c in replace.call_args_list],
+                         [self.shard("City")])
+        os.remove(self.shard("City") + ".tmp")
+        self.storage.delete(city)
+        self.storage.delete(state)
+        self.storage.save()
+
+    def test_reload_shards(self):
+        """Tests that reload reads every shard back"""
+        state = State(name="Kentucky")
+        city = City(name="Louisville", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.delete(city)
+        self.storage.reload()
+        state = self.storage.get(State, state.id)
+        self.assertEqual([c.id for c in state.cities], [city.id])
+        self.storage.delete(state.cities[0])
+        self.storage.delete(state)
+        self.storage.save()
+
+    def test_reload_single_file(self):
+        """Tests that the first sharded reload splits an existing file.json"""
+        FileStorage._FileStorage__sharded = False
+        state = State(name="Ohio")
+        city = City(name="Akron", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.delete(city)
+        FileStorage._FileStorage__sharded = True
+        for name in models.engine.file_storage.classes:
+            try:
+                os.remove(self.shard(name))
+            except FileNotFoundError:
+                pass
+        try:
+            self.storage.reload()
+            state = self.storage.get(State, state.id)
+            self.assertEqual([c.id for c in state.cities], [city.id])
+            self.storage.save()
+            self.assertIn("State." + state.id, self.read_shard("State"))
+            self.assertIn("City." + city.id, self.read_shard("City"))
+            self.storage.delete(state.cities[0])
+            self.storage.delete(state)
+            self.storage.save()
+        finally:
+            os.remove(self.storage._FileStorage__file_path)
+
+
+@unittest.skipUnless(os.getenv("HBNB_BENCHMARK"), "benchmarks only")
+class testFileStorageBenchmark(unittest.TestCase):
+    """Benchmarks for the FileStorage class"""
+
+    size = int(os.getenv("HBNB_BENCHMARK_SIZE", "1000000"))
+
+    def setUp(self):
+        """Writes a file.json holding size State records"""
+        self.storage = FileStorage()
+        set_flags(self, format="json", sharded=False, journal=False,
+                  window=0, lazy=False)
+        self.keys = []
+        records = {}
+        for i in range(self.size):
+            state_id = "{:032x}".format(i)
+            key = "State." + state_id
+            self.keys.append(key)
+            records[key] = {"id": state_id, "name": "state {}".format(i),
+                            "created_at": "2017-06-14T22:31:03.285259",
+                            "updated_at": "2017-06-14T22:31:03.285259",
+                            "__class__": "State"}
+        with open("file.json", "w", encoding="UTF8") as fd:
+            json.dump(records, fd)
+
+    def tearDown(self):
+        """Drops the loaded records"""
+        self.drop()
+        os.remove("file.json")
+
+    def drop(self):
+        """removes the benchmark records from the storage"""
+        objects = self.storage.all()
+        for key in self.keys:
+            if key in objects:
+                self.storage.delete(objects[key])
+
+    def test_reload_time(self):
+        """reports reload time with strptime and with parse_time"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        parsers = (("strptime",
+                    lambda text: datetime.strptime(text, t_format)),
+                   ("parse_time", models.base_model.parse_time))
+        print()
+        for label, parser in parsers:
+            self.drop()
+            with unittest.mock.patch("models.base_model.parse_time", parser):
+                tic = time.perf_counter()
+                self.storage.reload()
+                elapsed = time.perf_counter() - tic
+            print("reload {} objects ({}): {:.2f}s".format(
+                self.size, label, elapsed))
+
+    def test_formats(self):
+        """reports load and save time and file size per format"""
+        with open("file.json", encoding="UTF8") as fd:
+            records = list(json_stream.iter_items(fd))
+        print()
+        for label, stream, mode in (("json", json_stream, ""),
+                                    ("binary", binary_stream, "b")):
+            path = "bench." + label
+            tic = time.perf_counter()
+            with open(path, "w" + mode) as fd:
+                stream.dump_items(records, fd)
+            saved = time.perf_counter() - tic
+            tic = time.perf_counter()
+            with open(path, "r" + mode) as fd:
+                for item in stream.iter_items(fd):
+                    pass
+            loaded = time.perf_counter() - tic
+            print("{}: save {:.2f}s, load {:.2f}s, {:.1f} MB".format(
+                label, saved, loaded, os.path.getsize(path) / 1e6))
+            os.remove(path)
+
+    def test_intern_ids(self):
+        """reports reload memory for reviews, with and without interning"""
+        stamp = "2017-06-14T22:31:03.285259"
+        records = {}
+        for i in range(self.size // 10):
+            record = {"id": "{:032x}".format(i), "text": "Great stay",
+                      "place_id": "p{:031x}".format(i % (self.size // 100)),
+                      "user_id": "u{:031x}".format(i % (self.size // 1000)),
+                      "created_at": stamp, "updated_at": stamp,
+                      "__class__": "Review"}
+            records["Review." + record["id"]] = record
+        self.keys += list(records)
+        with open("file.json", "w", encoding="UTF8") as fd:
+            json.dump(records, fd)
+        print()
+        modules = ("models.base_model", "models.engine.file_storage")
+        for label, copies in (("copies", True), ("interned", False)):
+            self.drop()
+            patches = [unittest.mock.patch(name + ".intern_ids",
+                                           lambda attrs: attrs)
+                       for name in modules if copies]
+            for patch in patches:
+                patch.start()
+            tracemalloc.start()
+            self.storage.reload()
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            for patch in patches:
+                patch.stop()
+            reviews = self.storage.all("Review").values()
+            ids = {id(getattr(review, attr)) for review in reviews
+                   for attr in ("place_id", "user_id")}
+            print("reload {} reviews ({}): {:.1f} MB, {} fk strings".format(
+                len(records), label, used / 1e6, len(ids)))
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+""" Testing the json_stream module. """
+
+import io
+import json
+import unittest
+from models.engine.json_stream import dump_items, iter_items
+
+
+class testJsonStream(unittest.TestCase):
+    """Testing iter_items and dump_items"""
+
+    data = {"State.1": {"id": "1", "name": "A \"quoted\" }{ name",
+                        "__class__": "State"},
+            "Place.2": {"id": "2", "number_rooms": 12345,
+                        "latitude": 37.7749, "amenity_ids": [],
+                        "description": None, "__class__": "Place"},
+            "Misc": [1, 2.5, True, False, None, "x"],
+            "n": 1234567890}
+
+    def test_iter_items(self):
+        """Tests that every chunk size yields the same members"""
+        text = json.dumps(self.data)
+        for size in (1, 2, 7, 64, 1 << 16):
+            with self.subTest(size=size):
+                items = list(iter_items(io.StringIO(text), size))
+                self.assertEqual(dict(items), self.data)
+                self.assertEqual([k for k, v in items], list(self.data))
+
+    def test_iter_items_whitespace(self):
+        """Tests that indented JSON is read"""
+        text = json.dumps(self.data, indent=4)
+        self.assertEqual(dict(iter_items(io.StringIO(text), 3)), self.data)
+
+    def test_iter_items_empty(self):
+        """Tests an empty object"""
+        self.assertEqual(list(iter_items(io.StringIO(" { } "))), [])
+
+    def test_iter_items_bad_json(self):
+        """Tests that truncated or malformed files raise"""
+        for text in ("", "[]", '{"a": 1', '{"a": {"b": ', '{"a" 1}',
+                     '{1: 2}', '{"a": 1 "b": 2}'):
+            with self.subTest(text=text):
+                with self.assertRaises(json.JSONDecodeError):
+                    list(iter_items(io.StringIO(text), 2))
+
+    def test_dump_items(self):
+        """Tests that dump_items writes what json.dump would"""
+        f = io.StringIO()
+        dump_items(self.data.items(), f)
+        self.assertEqual(f.getvalue(), json.dumps(self.data))
+        f = io.StringIO()
+        dump_items([], f)
+        self.assertEqual(f.getvalue(), "{}")
+
+
+if __name__ == "__main__":
+    unittest.main()
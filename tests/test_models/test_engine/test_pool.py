@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Contains the tests for the InstrumentedPool class
+"""
+
+import pep8
+import sqlite3
+import unittest
+from sqlalchemy import create_engine, exc
+from models.engine.pool import InstrumentedPool, instrument
+
+
+class TestInstrumentedPool(unittest.TestCase):
+    """Tests the counters of the connection pool"""
+
+    def setUp(self):
+        """Creates an engine over a one connection pool"""
+        self.engine = create_engine("sqlite://", poolclass=InstrumentedPool,
+                                    pool_size=1, max_overflow=1,
+                                    pool_timeout=0.01)
+
+    def tearDown(self):
+        """Disposes of the engine"""
+        self.engine.dispose()
+
+    def test_pep8_conformance(self):
+        """Test that models/engine/pool.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/pool.py'])
+        self.assertEqual(result.total_errors, 0)
+
+    def test_overflow_and_wait(self):
+        """Tests that overflow connections and waits are counted"""
+        instrument(self.engine)
+        first = self.engine.connect()
+        second = self.engine.connect()
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+        first.close()
+        second.close()
+        stats = self.engine.pool.snapshot()
+        self.assertEqual(stats["connects"], 2)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["checkins"], 2)
+        self.assertEqual(stats["overflows"], 1)
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_seconds"], 0)
+        self.assertEqual(stats["checked_out"], 0)
+
+    def test_idle_ping(self):
+        """Tests that idle connections are pinged on checkout"""
+        instrument(self.engine, "idle", 0)
+        for _ in range(3):
+            self.engine.connect().close()
+        stats = self.engine.pool.snapshot()
+        self.assertEqual(stats["pings"], 2)
+        self.assertEqual(stats["connects"], 1)
+
+    def test_dispose_keeps_counters(self):
+        """Tests that recreating the pool keeps the counters"""
+        instrument(self.engine)
+        self.engine.connect().close()
+        self.engine.dispose()
+        self.engine.connect().close()
+        self.assertEqual(self.engine.pool.snapshot()["checkouts"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+""" Testing the rwlock module. """
+
+import threading
+import time
+import unittest
+from models.engine.rwlock import RWLock
+
+
+class testRWLock(unittest.TestCase):
+    """Testing the RWLock class"""
+
+    def setUp(self):
+        """Initializing the lock"""
+        self.lock = RWLock()
+
+    def test_readers_share(self):
+        """Tests that two threads can hold the read lock together"""
+        inside = threading.Barrier(2, timeout=5)
+
+        def reader():
+            with self.lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertFalse(inside.broken)
+
+    def test_writer_excludes_readers(self):
+        """Tests that a reader waits for the writer to release"""
+        events = []
+        self.lock.acquire_write()
+
+        def reader():
+            with self.lock.read():
+                events.append("read")
+
+        t = threading.Thread(target=reader)
+        t.start()
+        time.sleep(0.05)
+        events.append("write done")
+        self.lock.release()
+        t.join(5)
+        self.assertEqual(events, ["write done", "read"])
+
+    def test_reentrant(self):
+        """Tests that the writer may re-acquire and read"""
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    pass
+        with self.lock.read():
+            with self.lock.read():
+                pass
+        with self.lock.write():
+            pass
+
+    def test_no_upgrade(self):
+        """Tests that a reader cannot take the write lock"""
+        with self.lock.read():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,9 +13,12 @@ app = Flask(__name__)
 @app.route('/states/<state_id>', strict_slashes=False)
 def states(state_id=None):
     """display the states and cities listed in alphabetical order"""
-    states = storage.all("State")
     if state_id is not None:
+        state = storage.get("State", state_id, load=("cities",))
         state_id = 'State.' + state_id
+        states = {state_id: state} if state is not None else {}
+    else:
+        states = storage.all("State")
     return render_template('9-states.html', states=states, state_id=state_id)
 
 